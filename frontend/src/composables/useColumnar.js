@@ -0,0 +1,23 @@
+// Decoder for the columnar task encoding (format: 'columnar') returned by
+// planner.api.get_workload_data and planner.api.list_tasks
+
+export function decodeColumnar(payload) {
+  if (!payload || payload.format !== 'columnar') {
+    return payload
+  }
+
+  const { length, columns = {}, dictionaries = {} } = payload
+  const keys = Object.keys(columns)
+  const rows = new Array(length)
+
+  for (let i = 0; i < length; i++) {
+    const row = {}
+    for (const key of keys) {
+      const dictionary = dictionaries[key]
+      row[key] = dictionary ? dictionary[columns[key][i]] : columns[key][i]
+    }
+    rows[i] = row
+  }
+
+  return rows
+}
@@ -114,7 +114,12 @@ export function useTaskManager(department) {
         url: 'planner.api.batch_update_tasks',
         params: { updates },
         onSuccess: (data) => {
+          // Only items the server accepted are applied locally
+          const failed = new Set((Array.isArray(data) ? data : [])
+            .filter(result => !result.success)
+            .map(result => result.task_id))
           updates.forEach(update => {
+            if (failed.has(update.task_id)) return
             const index = tasks.value.findIndex(t => t.name === update.task_id)
             if (index !== -1) {
               tasks.value[index] = {
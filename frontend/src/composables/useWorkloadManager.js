@@ -1,6 +1,8 @@
-import { ref, computed, watch, nextTick } from 'vue'
+import { ref, computed, watch, nextTick, onScopeDispose } from 'vue'
 import { createResource } from 'frappe-ui'
 import { useErrorHandler } from '@/services/errorHandler'
+import { decodeColumnar } from './useColumnar'
+import { getSocket } from '@/socket'
 
 export function useWorkloadManager(initialDepartment) {
   // Core state
@@ -10,6 +12,15 @@ export function useWorkloadManager(initialDepartment) {
   const loading = ref(false)
   const error = ref(null)
   const lastUpdate = ref(null)
+  const heatmap = ref(null)
+  const syncCursor = ref(null)
+
+  // ETag of the last workload response and the query it answered
+  let workloadEtag = null
+  let workloadQuery = null
+
+  // Date window of the loaded data; syncs and reloads keep to it
+  let loadedWindow = { start: null, end: null }
 
   const { addError } = useErrorHandler()
 
@@ -34,6 +45,21 @@ export function useWorkloadManager(initialDepartment) {
     return new Date(dateStr)
   }
 
+  // Mirrors the server's filters for the loaded window: overlapping tasks
+  // when both ends are set, otherwise a bound on each set end
+  const inLoadedWindow = (task) => {
+    const start = parseDate(loadedWindow.start)
+    const end = parseDate(loadedWindow.end)
+    const taskStart = parseDate(task.startDate)
+    const taskEnd = parseDate(task.endDate)
+    if (start && end) {
+      return !!(taskStart && taskEnd && taskStart <= end && taskEnd >= start)
+    }
+    if (start && !(taskStart && taskStart >= start)) return false
+    if (end && !(taskEnd && taskEnd <= end)) return false
+    return true
+  }
+
   // Watch department changes
   watch(() => department.value, (newDept, oldDept) => {
     if (newDept !== oldDept) {
@@ -132,7 +158,9 @@ const processTaskData = (rawTasks) => {
         status: task.status || "Open",
         priority: task.priority || "Medium",
         color: task.color || "#6B7280",
-        description: task.description || ""
+        description: task.description || "",
+        modified: task.modified || null,
+        version: task.version || 0
       }
     })
   }
@@ -170,9 +198,36 @@ const processAssigneeData = (rawAssignees) => {
     })
   }
 
+  // GET so the browser sends If-None-Match; resolves to null on 304 (unchanged)
+  const fetchWorkloadData = async (params) => {
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, value]) => value !== null && value !== undefined)
+    ).toString()
+    const headers = { Accept: 'application/json', 'X-Frappe-CSRF-Token': window.csrf_token }
+    if (workloadEtag && workloadQuery === query) {
+      headers['If-None-Match'] = workloadEtag
+    }
+
+    const response = await fetch(`/api/method/planner.api.get_workload_data?${query}`, {
+      headers,
+      credentials: 'include'
+    })
+    if (response.status === 304) return null
+
+    const body = await response.json().catch(() => ({}))
+    if (!response.ok) {
+      throw new Error(body._error_message || body.exc_type || `Request failed with status ${response.status}`)
+    }
+
+    workloadEtag = response.headers.get('ETag')
+    workloadQuery = query
+    return body.message
+  }
+
   // Main data loading function
   const loadWorkloadData = async (startDate = null, endDate = null, forceRefresh = false) => {
     console.log("Loading workload data for department:", department.value)
+    loadedWindow = { start: formatDateForAPI(startDate), end: formatDateForAPI(endDate) }
 
     // Check cache first
     if (!forceRefresh) {
@@ -181,7 +236,9 @@ const processAssigneeData = (rawAssignees) => {
         console.log("Using cached data")
         assignees.value = cached.assignees
         tasks.value = cached.tasks
+        syncCursor.value = cached.syncCursor
         lastUpdate.value = cached.timestamp
+        await syncChanges()
         return
       }
     }
@@ -190,48 +247,165 @@ const processAssigneeData = (rawAssignees) => {
     error.value = null
 
     try {
-      const resource = createResource({
-        url: 'planner.api.get_workload_data',
-        params: { 
-          department: department.value,
-          start_date: formatDateForAPI(startDate),
-          end_date: formatDateForAPI(endDate)
-        },
-        onSuccess: (data) => {
-          console.log("API Response received:", data)
-          
-          // Process data
-          tasks.value = processTaskData(data.tasks || [])
-          assignees.value = processAssigneeData(data.assignees || [])
-          
-          lastUpdate.value = new Date()
-          saveToCache()
-          
-          console.log(`Processed ${tasks.value.length} tasks and ${assignees.value.length} assignees`)
-        },
-        onError: (err) => {
-          console.error('Error loading workload data:', err)
-          error.value = err
-          
-          // Set empty data
-          tasks.value = []
-          assignees.value = []
-          
-          // Add error to error handler
-          addError({
-            title: 'Workload Data Error',
-            message: err.message || 'Failed to load workload data',
-            type: 'error'
-          })
-        }
+      const data = await fetchWorkloadData({
+        department: department.value,
+        start_date: loadedWindow.start,
+        end_date: loadedWindow.end,
+        format: 'columnar'
       })
 
-      await resource.submit()
+      if (data === null) {
+        console.log("Workload data not modified")
+      } else {
+        console.log("API Response received:", data)
+        
+        // Process data
+        tasks.value = processTaskData(decodeColumnar(data.tasks) || [])
+        assignees.value = processAssigneeData(data.assignees || [])
+        syncCursor.value = data.sync_cursor || null
+        
+        console.log(`Processed ${tasks.value.length} tasks and ${assignees.value.length} assignees`)
+      }
+      
+      lastUpdate.value = new Date()
+      saveToCache()
+    } catch (err) {
+      console.error('Error loading workload data:', err)
+      error.value = err
+      
+      // Set empty data
+      tasks.value = []
+      assignees.value = []
+      workloadEtag = null
+      
+      // Add error to error handler
+      addError({
+        title: 'Workload Data Error',
+        message: err.message || 'Failed to load workload data',
+        type: 'error'
+      })
     } finally {
       loading.value = false
     }
   }
 
+  // Pull only tasks changed or deleted since the last load and patch them in place
+  const syncChanges = async () => {
+    const { start, end } = loadedWindow
+    if (!syncCursor.value) {
+      return loadWorkloadData(start, end, true)
+    }
+
+    let hasMore = true
+    while (hasMore) {
+      const data = await createResource({
+        url: 'planner.api.get_task_changes',
+        params: {
+          department: department.value,
+          cursor: syncCursor.value
+        }
+      }).submit()
+
+      if (!data || data.reset) {
+        return loadWorkloadData(start, end, true)
+      }
+
+      const removed = new Set([
+        ...(data.deleted || []),
+        ...(data.changed || []).map(t => t.id)
+      ])
+      tasks.value = [
+        ...tasks.value.filter(t => !removed.has(t.id)),
+        ...processTaskData(data.changed || []).filter(inLoadedWindow)
+      ]
+      syncCursor.value = data.next_cursor
+      hasMore = data.has_more
+    }
+
+    lastUpdate.value = new Date()
+    saveToCache()
+  }
+
+  // Realtime: batch_task_update events carry formatted tasks, so local
+  // state is patched in place. Versions guard against out-of-order events.
+  const applyRealtimeUpdates = ({ department: dept, updates = [] }) => {
+    if (dept && dept !== department.value) return
+
+    const byId = new Map(tasks.value.map((t, i) => [t.id, i]))
+    const removed = new Set()
+    const next = [...tasks.value]
+
+    updates.forEach(update => {
+      const index = byId.get(update.task_id)
+      const current = index !== undefined ? next[index] : null
+      if (current && current.version >= update.version) return
+
+      const task = update.task && { ...processTaskData([update.task])[0], version: update.version }
+      if (update.deleted || (task && !inLoadedWindow(task))) {
+        removed.add(update.task_id)
+      } else if (task) {
+        if (current) {
+          next[index] = task
+        } else {
+          byId.set(task.id, next.push(task) - 1)
+        }
+      }
+    })
+
+    tasks.value = next.filter(t => !removed.has(t.id))
+    lastUpdate.value = new Date()
+    saveToCache()
+  }
+
+  // The Atlas Task room checks read permission on Atlas Task; batches for
+  // other departments are dropped by applyRealtimeUpdates
+  const socket = getSocket()
+  socket.emit('doctype_subscribe', 'Atlas Task')
+  socket.on('batch_task_update', applyRealtimeUpdates)
+  onScopeDispose(() => {
+    socket.off('batch_task_update', applyRealtimeUpdates)
+  })
+
+  // Per-day load is computed server-side so the view does not loop
+  // over every task for every assignee and day
+  const loadHeatmap = async (startDate = null, endDate = null) => {
+    const resource = createResource({
+      url: 'planner.api.get_workload_heatmap',
+      params: {
+        department: department.value,
+        start_date: formatDateForAPI(startDate),
+        end_date: formatDateForAPI(endDate)
+      },
+      onSuccess: (data) => {
+        heatmap.value = data
+      },
+      onError: (err) => {
+        console.error('Error loading workload heatmap:', err)
+        heatmap.value = null
+      }
+    })
+
+    await resource.submit()
+    return heatmap.value
+  }
+
+  const getDailyLoad = (assigneeId, date) => {
+    if (!heatmap.value) return null
+    const row = heatmap.value.assignees?.[assigneeId]
+    if (!row) return null
+
+    const start = parseDate(heatmap.value.start_date)
+    const offset = Math.round((parseDate(formatDateForAPI(date)) - start) / (1000 * 60 * 60 * 24))
+    if (offset < 0 || offset >= heatmap.value.days) return null
+
+    return {
+      hours: row.load[offset],
+      tasks: row.tasks[offset],
+      capacity: row.capacity[offset],
+      overloaded: row.load[offset] > row.capacity[offset]
+    }
+  }
+
   // Task operations
   const createTask = async (taskData) => {
     loading.value = true
@@ -288,19 +462,22 @@ const processAssigneeData = (rawAssignees) => {
           task_id: taskId,
           assignee_id: assigneeId,
           start_date: formatDateForAPI(startDate),
-          end_date: formatDateForAPI(endDate)
+          end_date: formatDateForAPI(endDate),
+          modified: tasks.value.find(t => t.id === taskId)?.modified
         },
-        onSuccess: () => {
-          // Update local task data
+        onSuccess: (data) => {
+          // The server's copy of the task wins, whether moved or in conflict
           const taskIndex = tasks.value.findIndex(t => t.id === taskId)
-          if (taskIndex !== -1) {
-            tasks.value[taskIndex] = {
-              ...tasks.value[taskIndex],
-              assignee: assigneeId,
-              startDate: parseDate(startDate),
-              endDate: parseDate(endDate),
-              isScheduled: !!(startDate && endDate)
-            }
+          if (taskIndex !== -1 && data?.task) {
+            tasks.value[taskIndex] = processTaskData([data.task])[0]
+          }
+
+          if (data?.conflict) {
+            addError({
+              title: 'Task Changed',
+              message: data.message || 'Task was changed by someone else',
+              type: 'warning'
+            })
           }
           
           // Recalculate utilizations
@@ -412,6 +589,8 @@ const processAssigneeData = (rawAssignees) => {
     const cacheData = {
       assignees: assignees.value,
       tasks: tasks.value,
+      syncCursor: syncCursor.value,
+      window: loadedWindow,
       timestamp: new Date().getTime()
     }
     try {
@@ -426,9 +605,14 @@ const processAssigneeData = (rawAssignees) => {
       const cached = localStorage.getItem(getCacheKey(department.value))
       if (!cached) return null
 
-      const { assignees: cachedAssignees, tasks: cachedTasks, timestamp } = JSON.parse(cached)
+      const { assignees: cachedAssignees, tasks: cachedTasks, syncCursor: cachedCursor, window, timestamp } = JSON.parse(cached)
       const now = new Date().getTime()
 
+      // Data for another window would be filtered against the wrong range
+      if (!window || window.start !== loadedWindow.start || window.end !== loadedWindow.end) {
+        return null
+      }
+
       if (now - timestamp > CACHE_DURATION) {
         clearCache()
         return null
@@ -437,6 +621,7 @@ const processAssigneeData = (rawAssignees) => {
       return { 
         assignees: cachedAssignees, 
         tasks: cachedTasks, 
+        syncCursor: cachedCursor,
         timestamp 
       }
     } catch (e) {
@@ -481,6 +666,7 @@ const processAssigneeData = (rawAssignees) => {
     loading,
     error,
     lastUpdate,
+    heatmap,
     
     // Computed
     workloadStats,
@@ -489,6 +675,8 @@ const processAssigneeData = (rawAssignees) => {
     
     // Methods
     loadWorkloadData,
+    loadHeatmap,
+    syncChanges,
     moveTask,
     updateTask,
     clearCache,
@@ -497,6 +685,7 @@ const processAssigneeData = (rawAssignees) => {
     getTasksForAssignee,
     getTasksInDateRange,
     calculateUtilization,
+    getDailyLoad,
     formatDateForAPI
   }
 }
\ No newline at end of file
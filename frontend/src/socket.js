@@ -0,0 +1,25 @@
+import { io } from 'socket.io-client'
+
+let socket = null
+
+// Shared connection to the Frappe socket.io server. Like Frappe's own
+// client: under `bench start` (dev_server, or the Vite dev server) socket.io
+// listens on its own port, otherwise it is served from the page origin.
+export function getSocket() {
+  if (socket) return socket
+
+  let host = window.location.origin
+  if (window.dev_server || import.meta.env.DEV) {
+    const { protocol, hostname } = window.location
+    host = `${protocol}//${hostname}:${window.socketio_port || 9000}`
+  }
+  const siteName = window.site_name && !window.site_name.startsWith('{{')
+    ? window.site_name
+    : window.location.hostname
+
+  socket = io(`${host}/${siteName}`, {
+    withCredentials: true,
+    reconnectionAttempts: 5
+  })
+  return socket
+}
@@ -1,10 +1,42 @@
 from frappe import _
-from frappe.utils import now_datetime, get_datetime, getdate, add_days, date_diff
-from .realtime import emit_task_update, emit_batch_update
+from frappe.utils import now_datetime, get_datetime, add_days, date_diff
+from .realtime import emit_batch_update
 from planner.services.workload_service import WorkloadService
 from planner.services.task_service import TaskService
+from planner.services.load_service import LoadService
+from planner.services.assignment_service import AssignmentService
+from planner.services.sync_service import SyncService
+from planner.services.version_service import VersionService
 import frappe
 import traceback
+from werkzeug.wrappers import Response
+
+# Response fields of list_tasks and the Atlas Task columns each one needs
+LIST_TASK_FIELD_COLUMNS = {
+    "id": ["name"],
+    "title": ["subject"],
+    "status": ["status"],
+    "department": ["department"],
+    "assignee": ["_assign"],
+    "project": ["project"],
+    "scheduled": ["exp_start_date", "exp_end_date"],
+    "created_by": ["owner"],
+    "created_at": ["creation"]
+}
+
+# Backlog rows are returned as stored; color is derived from status/priority
+BACKLOG_FIELD_COLUMNS = {
+    "subject": ["subject"],
+    "status": ["status"],
+    "priority": ["priority"],
+    "project": ["project"],
+    "exp_start_date": ["exp_start_date"],
+    "exp_end_date": ["exp_end_date"],
+    "expected_time": ["expected_time"],
+    "department": ["department"],
+    "color": ["color", "status", "priority"],
+    "_assign": ["_assign"]
+}
 
 @frappe.whitelist(allow_guest=True)
 def oauth_providers():
@@ -110,18 +142,29 @@ def handle_api_error(e, error_title, fallback_data=None):
     return error_response
 
 @frappe.whitelist()
-def get_workload_data(department=None, start_date=None, end_date=None):
-    """Get workload data for ClickUp-style workload view"""
+def get_workload_data(department=None, start_date=None, end_date=None, fields=None, format=None):
+    """Get workload data for ClickUp-style workload view
+
+    `fields` is an optional list of task fields (see TASK_FIELD_COLUMNS).
+    With format="columnar" tasks are sent column-wise and dictionary
+    encoded (see TaskService.encode_columnar).
+    Responses carry an ETag; a matching If-None-Match is answered with 304
+    before any capacity or formatting work is done.
+    """
     try:
         print("\n=== Workload Data Request ===")
         print(f"Department: {department}")
         print(f"Start Date: {start_date}")
         print(f"End Date: {end_date}")
         
+        etag = VersionService.get_workload_etag(department, start_date, end_date, fields, format)
+        if VersionService.is_not_modified(etag):
+            return not_modified_response(etag)
+        
         if not hasattr(WorkloadService, 'get_workload_data'):
             raise AttributeError("WorkloadService.get_workload_data method not found")
             
-        workload_data = WorkloadService.get_workload_data(department, start_date, end_date)
+        workload_data = WorkloadService.get_workload_data(department, start_date, end_date, fields)
         
         if not isinstance(workload_data, dict):
             workload_data = {
@@ -138,7 +181,10 @@ def get_workload_data(department=None, start_date=None, end_date=None):
         print(f"Total Assignees: {len(workload_data['assignees'])}")
         print(f"Total Tasks: {len(workload_data['tasks'])}")
         
-        return workload_data
+        if format == "columnar":
+            workload_data["tasks"] = TaskService.encode_columnar(workload_data["tasks"])
+        
+        return etag_response(workload_data, etag)
         
     except Exception as e:
         try:
@@ -160,6 +206,69 @@ def get_workload_data(department=None, start_date=None, end_date=None):
         
         return handle_api_error(e, "Workload Data Error", fallback_data)
 
+def not_modified_response(etag):
+    """Empty 304 response for a request whose If-None-Match matched"""
+    response = Response(status=304)
+    response.headers["ETag"] = etag
+    return response
+
+def etag_response(data, etag):
+    """Wrap whitelisted method output in Frappe's envelope with an ETag
+
+    Outside an HTTP request (tests, bench console) the data is returned
+    unchanged.
+    """
+    if not getattr(frappe.local, "request", None):
+        return data
+    
+    response = Response(frappe.as_json({"message": data}, indent=None), mimetype="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+@frappe.whitelist()
+def get_workload_heatmap(department=None, start_date=None, end_date=None):
+    """Get per-day allocated hours and overload flags for each assignee"""
+    try:
+        return WorkloadService.get_workload_heatmap(department, start_date, end_date)
+    except Exception as e:
+        return handle_api_error(e, "Workload Heatmap Error", {"assignees": {}})
+
+@frappe.whitelist()
+def get_assignee_load(assignees, start_date, end_date):
+    """Get per-day allocated hours and task counts from the Planner Load table"""
+    try:
+        if isinstance(assignees, str):
+            assignees = frappe.parse_json(assignees)
+        return LoadService.get_load(assignees, start_date, end_date)
+    except Exception as e:
+        return handle_api_error(e, "Assignee Load Error", {})
+
+@frappe.whitelist()
+def get_assignee_tasks(assignee, department=None, start_date=None, end_date=None):
+    """Get Atlas Tasks whose primary assignee is the given user"""
+    try:
+        return TaskService.get_all_tasks(department, start_date, end_date, assignee=assignee, overlap=True)
+    except Exception as e:
+        return handle_api_error(e, "Assignee Tasks Error", [])
+
+@frappe.whitelist()
+def get_task_changes(department=None, cursor=None, page_length=None, fields=None):
+    """Get Atlas Tasks created, changed or deleted since a sync cursor
+
+    Returns {changed, deleted, next_cursor, has_more, reset}. Pass the
+    `sync_cursor` from get_workload_data (or a previous next_cursor); when
+    `reset` is set the client must reload in full.
+    """
+    try:
+        return SyncService.get_changes(department, cursor, page_length, fields)
+    except frappe.ValidationError:
+        raise
+    except Exception as e:
+        return handle_api_error(e, "Task Changes Error", {
+            "changed": [], "deleted": [], "next_cursor": cursor, "has_more": False, "reset": True
+        })
+
 def get_fallback_workload_data(department=None):
     """Get fallback workload data when WorkloadService fails"""
     try:
@@ -214,8 +323,9 @@ def get_fallback_workload_data(department=None):
                 limit=100
             )
             
+            task_assignees = TaskService.resolve_primary_assignees(task_list)
             for task in task_list:
-                assignee = get_primary_assignee(task)
+                assignee = task_assignees[task.name]
                 tasks.append({
                     "id": task.name,
                     "title": task.subject,
@@ -298,6 +408,29 @@ Created Atlas Task:
     except Exception as e:
         return handle_api_error(e, "Task Creation Error")
 
+@frappe.whitelist()
+def create_atlas_tasks(tasks):
+    """Create many Atlas Tasks in one request
+
+    `tasks` is a list of task_data dicts as accepted by create_atlas_task.
+    Returns one {"index", "success", "name" or "error"} result per row.
+    """
+    try:
+        if isinstance(tasks, str):
+            tasks = frappe.parse_json(tasks)
+        
+        results = TaskService.create_tasks(tasks)
+        created = sum(1 for result in results if result["success"])
+        
+        return {
+            "success": created == len(results),
+            "created": created,
+            "failed": len(results) - created,
+            "results": results
+        }
+    except Exception as e:
+        return handle_api_error(e, "Bulk Task Creation Error")
+
 @frappe.whitelist()
 def create_test_task():
     """Create a test Atlas Task for debugging"""
@@ -380,92 +513,184 @@ Created test task:
             }
         )
 
+def get_list_tasks_page(cursor=None, page_length=None, fields=None):
+    """Fetch one keyset page of list_tasks rows as (tasks, next_cursor)"""
+    page_length = TaskService.get_page_length(page_length)
+    condition, values = TaskService.keyset_condition(cursor)
+    columns = TaskService.get_field_columns(fields, LIST_TASK_FIELD_COLUMNS) + ["creation"]
+    
+    tasks = frappe.db.sql(f"""
+        SELECT {", ".join(dict.fromkeys(columns))}
+        FROM `tabAtlas Task`
+        {"WHERE " + condition if condition else ""}
+        ORDER BY creation DESC, name DESC
+        LIMIT %(limit)s
+    """, {**values, "limit": page_length + 1}, as_dict=True)
+    tasks, next_cursor = TaskService.split_page(tasks, page_length)
+    
+    task_assignees = {}
+    if not fields or "assignee" in fields:
+        task_assignees = TaskService.resolve_primary_assignees(tasks)
+    formatted_tasks = []
+    for task in tasks:
+        try:
+            formatted = {
+                "id": task.name,
+                "title": task.subject,
+                "status": task.status,
+                "department": task.department,
+                "assignee": task_assignees.get(task.name, "Unassigned"),
+                "project": task.project,
+                "scheduled": bool(task.exp_start_date and task.exp_end_date),
+                "created_by": task.owner,
+                "created_at": task.creation
+            }
+            formatted_tasks.append({f: formatted[f] for f in fields} if fields else formatted)
+        except Exception as e:
+            print(f"Error formatting task {task.name}: {str(e)}")
+            continue
+    
+    return formatted_tasks, next_cursor
+
 @frappe.whitelist()
-def list_tasks():
-    """List all Atlas Tasks in the system with their details"""
+def list_tasks(cursor=None, page_length=None, format=None, fields=None):
+    """List Atlas Tasks newest first, one keyset page at a time
+
+    Pass the returned next_cursor to get the following page; with
+    format="ndjson" every page is streamed as newline-delimited JSON and
+    with format="columnar" the page is sent column-wise.
+    `fields` limits the returned keys (see LIST_TASK_FIELD_COLUMNS).
+    """
     try:
-        tasks = frappe.get_all(
-            "Atlas Task",
-            fields=[
-                "name", "subject", "status", "priority", "project",
-                "exp_start_date", "exp_end_date", "expected_time",
-                "department", "_assign", "owner", "creation"
-            ],
-            order_by="creation desc"
-        )
+        fields = TaskService.parse_fields(fields, LIST_TASK_FIELD_COLUMNS)
         
-        formatted_tasks = []
-        for task in tasks:
-            try:
-                assignee = "Unassigned"
-                if task._assign:
-                    assigned_users = frappe.parse_json(task._assign)
-                    if assigned_users and len(assigned_users) > 0:
-                        assignee = assigned_users[0]
-                
-                formatted_tasks.append({
-                    "id": task.name,
-                    "title": task.subject,
-                    "status": task.status,
-                    "department": task.department,
-                    "assignee": assignee,
-                    "project": task.project,
-                    "scheduled": bool(task.exp_start_date and task.exp_end_date),
-                    "created_by": task.owner,
-                    "created_at": task.creation
-                })
-            except Exception as e:
-                print(f"Error formatting task {task.name}: {str(e)}")
-                continue
+        if format == "ndjson":
+            return ndjson_response(
+                lambda c, n: get_list_tasks_page(c, n, fields),
+                cursor, page_length
+            )
+        
+        formatted_tasks, next_cursor = get_list_tasks_page(cursor, page_length, fields)
         
-        print(f"Found {len(tasks)} total tasks, {len(formatted_tasks)} formatted successfully")
         return {
-            "total_count": len(tasks),
-            "tasks": formatted_tasks
+            "total_count": len(formatted_tasks),
+            "tasks": TaskService.encode_columnar(formatted_tasks) if format == "columnar" else formatted_tasks,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
         print(f"Error listing tasks: {str(e)}")
         frappe.log_error(frappe.get_traceback(), "List Tasks Error")
-        return {"error": str(e), "total_count": 0, "tasks": []}
+        return {"error": str(e), "total_count": 0, "tasks": [], "next_cursor": None}
+
+def get_backlog_page(searchtext=None, projectText=None, cursor=None, page_length=None, fields=None):
+    """Fetch one keyset page of unassigned backlog tasks as (tasks, next_cursor)"""
+    page_length = TaskService.get_page_length(page_length)
+    tasks = get_backlog_tasks(searchtext, projectText, cursor, page_length + 1, fields)
+    tasks, next_cursor = TaskService.split_page(tasks, page_length)
+    
+    return pick_backlog_fields(tasks, fields), next_cursor
+
+def pick_backlog_fields(tasks, fields=None):
+    """Drop helper columns from backlog rows when specific fields were requested"""
+    if not fields:
+        return tasks
+    return [frappe._dict({f: task[f] for f in ["name"] + fields}) for task in tasks]
+
+def get_backlog_tasks(searchtext=None, projectText=None, cursor=None, limit=None, fields=None):
+    """Unassigned backlog tasks newest first, after `cursor` and up to `limit` rows if given"""
+    columns = TaskService.get_field_columns(fields, BACKLOG_FIELD_COLUMNS) + ["creation"]
+    conditions = [AssignmentService.unassigned_condition()]
+    condition, values = TaskService.keyset_condition(cursor)
+    if condition:
+        conditions.append(condition)
+    
+    if searchtext:
+        conditions.append("subject LIKE %(searchtext)s")
+        values["searchtext"] = f"%{searchtext}%"
+    
+    if projectText:
+        conditions.append("project LIKE %(project)s")
+        values["project"] = f"%{projectText}%"
+    
+    tasks = frappe.db.sql(f"""
+        SELECT {", ".join(dict.fromkeys(columns))}
+        FROM `tabAtlas Task`
+        WHERE {" AND ".join(conditions)}
+        ORDER BY creation DESC, name DESC
+        {"LIMIT %(limit)s" if limit else ""}
+    """, {**values, "limit": limit}, as_dict=True)
+    
+    if not fields or "color" in fields:
+        for task in tasks:
+            task.color = get_task_color(task)
+    
+    return tasks
 
 @frappe.whitelist()
-def planner_get_backlog(searchtext=None, projectText=None):
-    """Get Atlas Tasks for the backlog with enhanced search"""
+def planner_get_backlog(searchtext=None, projectText=None, cursor=None, page_length=None, format=None, fields=None):
+    """Get unassigned Atlas Tasks for the backlog
+
+    Without `cursor` or `page_length` the whole backlog is returned as a
+    list; with either, one keyset page is returned as {tasks, next_cursor}.
+    `fields` limits the returned columns (see BACKLOG_FIELD_COLUMNS).
+    JSON responses carry an ETag and answer a matching If-None-Match with 304.
+    """
     print(f"\n=== Planner Backlog Request ===") 
     try:
-        filters = {
-            "_assign": ["is", "null"],
-        }
+        fields = TaskService.parse_fields(fields, BACKLOG_FIELD_COLUMNS)
+        fetch_page = lambda c, n: get_backlog_page(searchtext, projectText, c, n, fields)
         
-        if searchtext:
-            filters.update({
-                "subject": ["like", f"%{searchtext}%"]
-            })
+        if format == "ndjson":
+            return ndjson_response(fetch_page, cursor, page_length)
         
-        if projectText:
-            filters.update({
-                "project": ["like", f"%{projectText}%"]
-            })
+        etag = VersionService.get_backlog_etag(searchtext, projectText, cursor, page_length, fields)
+        if VersionService.is_not_modified(etag):
+            return not_modified_response(etag)
         
-        tasks = frappe.get_all(
-            "Atlas Task",
-            filters=filters,
-            fields=[
-                "name", "subject", "status", "priority", "project",
-                "exp_start_date", "exp_end_date", "expected_time",
-                "department", "color", "_assign"
-            ],
-            order_by="creation desc"
-        )
+        if not cursor and not page_length:
+            # Unpaged: one query, as before paging existed
+            tasks = get_backlog_tasks(searchtext, projectText, fields=fields)
+            return etag_response(pick_backlog_fields(tasks, fields), etag)
         
-        for task in tasks:
-            task.color = get_task_color(task)
-        
-        return tasks
+        tasks, next_cursor = fetch_page(cursor, page_length)
+        return etag_response({"tasks": tasks, "next_cursor": next_cursor}, etag)
+    except frappe.ValidationError:
+        raise
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "Planner Backlog Error")
-        return []
+        return {"tasks": [], "next_cursor": None} if cursor or page_length else []
+
+def ndjson_response(fetch_page, cursor=None, page_length=None):
+    """Stream every page from fetch_page(cursor, page_length) as NDJSON
+
+    Only one page is held in memory at a time. Frappe tears down the
+    request context (and its database connection) before the body is
+    iterated, so the generator sets up its own for the same site and user
+    and destroys it once streaming ends.
+    """
+    site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+    
+    def generate():
+        # Outside a request (tests, console) the caller's context is still live
+        own_context = not getattr(frappe.local, "initialised", False)
+        if own_context:
+            frappe.init(site=site, sites_path=sites_path)
+            frappe.connect()
+            frappe.set_user(user)
+        try:
+            next_cursor = cursor
+            while True:
+                rows, next_cursor = fetch_page(next_cursor, page_length)
+                for row in rows:
+                    yield frappe.as_json(row, indent=None, separators=(",", ":")) + "\n"
+                if not next_cursor:
+                    break
+        finally:
+            if own_context:
+                frappe.destroy()
+    
+    return Response(generate(), mimetype="application/x-ndjson")
 
 @frappe.whitelist()
 def update_task(**kwargs):
@@ -491,13 +716,9 @@ def update_task(**kwargs):
             setattr(task, field, value)
         
         task.modified = now_datetime()
+        # Realtime updates are queued by the Atlas Task on_update hook
         task.save()
         
-        try:
-            emit_task_update(task)
-        except:
-            pass
-        
         return task.as_dict()
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "Update Task Error")
@@ -505,21 +726,31 @@ def update_task(**kwargs):
 
 @frappe.whitelist()
 def batch_update_tasks(updates):
-    """Update multiple Atlas Tasks in batch with real-time notifications"""
+    """Update multiple Atlas Tasks in one round trip
+
+    `updates` is a list of {"task_id", "changes"}; returns one
+    {"task_id", "success", "task" or "error"} result per item.
+    """
     try:
+        if isinstance(updates, str):
+            updates = frappe.parse_json(updates)
+        
         if not updates:
             frappe.throw(_("No updates provided"))
         
         if hasattr(TaskService, 'batch_update_tasks'):
-            updated_tasks = TaskService.batch_update_tasks(updates)
+            results = TaskService.batch_update_tasks(updates)
         else:
-            updated_tasks = []
+            results = []
             for update in updates:
-                result = update_task(update.get('task_id'), update.get('updates', {}))
-                if 'error' not in result:
-                    updated_tasks.append(result)
+                result = update_task(task_id=update.get('task_id'), updates=update.get('changes', {}))
+                results.append({
+                    "task_id": update.get('task_id'),
+                    "success": 'error' not in result,
+                    **({"error": result["error"]} if 'error' in result else {"task": result})
+                })
         
-        return updated_tasks
+        return results
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "Batch Update Tasks Error")
         return {"error": str(e)}
@@ -567,68 +798,17 @@ def get_task_assignees(task):
 
 def get_primary_assignee(task):
     """Get the primary assignee from Atlas Task _assign field"""
-    try:
-        if task._assign:
-            frappe.logger().debug(f"Task {task.name} _assign field: {task._assign}")
-            assigned_users = frappe.parse_json(task._assign)
-            frappe.logger().debug(f"Parsed assigned users: {assigned_users}")
-            
-            if assigned_users and len(assigned_users) > 0:
-                assignee = assigned_users[0]
-                user_exists = frappe.db.exists("User", assignee)
-                if user_exists:
-                    return assignee
-                else:
-                    frappe.logger().warning(f"Invalid user {assignee} assigned to task {task.name}")
-            else:
-                frappe.logger().debug(f"No users in _assign list for task {task.name}")
-        else:
-            frappe.logger().debug(f"No _assign field for task {task.name}")
-    except Exception as e:
-        frappe.logger().error(f"Error getting primary assignee for task {task.name}: {str(e)}")
-    
-    return "Unassigned"
+    return TaskService.resolve_primary_assignees([task])[task.name]
 
 @frappe.whitelist()
-def move_task(task_id, assignee_id=None, start_date=None, end_date=None):
-    """Move Atlas Task to different assignee or schedule"""
+def move_task(task_id, assignee_id=None, start_date=None, end_date=None, modified=None):
+    """Move Atlas Task to different assignee or schedule
+
+    Pass the task's last seen `modified` to detect concurrent edits; on a
+    conflict the response has conflict=True and the current task.
+    """
     try:
-        if not task_id:
-            frappe.throw(_("Task ID is required"))
-        
-        task = frappe.get_doc("Atlas Task", task_id)
-        
-        if assignee_id:
-            if assignee_id == "unassigned":
-                task._assign = None
-            else:
-                employee = frappe.get_value("Employee", {"user_id": assignee_id}, "name")
-                if employee:
-                    task._assign = frappe.as_json([assignee_id])
-                else:
-                    frappe.throw(_("Invalid assignee"))
-        
-        if start_date:
-            task.exp_start_date = getdate(start_date)
-        if end_date:
-            task.exp_end_date = getdate(end_date)
-        
-        try:
-            task.save(ignore_version=True)
-            frappe.db.commit()
-        except frappe.TimestampMismatchError:
-            task.reload()
-            task.save(ignore_version=True)
-            frappe.db.commit()
-        
-        emit_task_update(task)
-        
-        return {
-            "success": True,
-            "task": TaskService.format_task(task),
-            "message": "Task moved successfully"
-        }
-        
+        return TaskService.move_task(task_id, assignee_id, start_date, end_date, modified)
     except Exception as e:
         frappe.logger().error(f"Error moving task: {str(e)}")
         return handle_api_error(e, "Move Task Error")
@@ -1,93 +1,378 @@
+import copy
+import pickle
+import threading
+import time
+from collections import OrderedDict
+import redis
 import frappe
-from frappe.utils import cint
-from datetime import datetime, timedelta
+from frappe.utils import cint, getdate
+from datetime import datetime
 
 CACHE_KEYS = {
     'PLANNER_TASKS': 'planner_tasks_{department}',
     'TASK_STATS': 'task_stats_{department}',
+    'WORKLOAD': 'planner_workload_{department}',
     'USER_PREFERENCES': 'planner_preferences_{user}'
 }
 
+# Task, stats and workload entries are invalidated by doc events (see the
+# hooks at the end of this module), so their TTLs only bound what no event covers
 CACHE_EXPIRY = {
-    'PLANNER_TASKS': 300,  # 5 minutes
-    'TASK_STATS': 600,     # 10 minutes
+    'PLANNER_TASKS': 21600,  # 6 hours
+    'TASK_STATS': 21600,     # 6 hours
+    'WORKLOAD': 21600,       # 6 hours
     'USER_PREFERENCES': 3600  # 1 hour
 }
 
-def get_cached_tasks(department=None):
-    """Get tasks from cache or fetch from database"""
-    cache_key = CACHE_KEYS['PLANNER_TASKS'].format(department=department or 'all')
-    tasks = frappe.cache().get_value(cache_key)
-    
-    if tasks is None:
-        # Cache miss - fetch from database
-        tasks = fetch_and_cache_tasks(department)
-    
-    return tasks
+# Single-flight recomputation: lock lifetime, and how long and how often
+# other callers wait for the holder's result
+CACHE_LOCK_TIMEOUT = 60
+CACHE_LOCK_WAIT = 10
+CACHE_LOCK_POLL = 0.05
 
-def fetch_and_cache_tasks(department=None):
-    """Fetch tasks from database and update cache"""
-    from .api import get_planner_tasks
-    
-    tasks = get_planner_tasks(department)
-    cache_key = CACHE_KEYS['PLANNER_TASKS'].format(department=department or 'all')
-    
-    frappe.cache().set_value(
-        cache_key,
-        tasks,
-        expires_in_sec=CACHE_EXPIRY['PLANNER_TASKS']
+# Generation counters: one global and one per department namespace. Every
+# planner key embeds both, so one INCR retires a department's or the whole
+# site's entries; orphaned hashes simply run out their TTL
+GENERATION_KEY = 'planner_cache_generation'
+
+# Bumped per department by targeted invalidation, after the entries are
+# deleted; the process-local tier drops entries read at an older revision
+REVISION_KEY = 'planner_cache_revision'
+
+# Process-local tier in front of Redis. Entries live at most this long even
+# if nothing invalidates them; the byte budget can be changed with
+# `planner_local_cache_bytes` in site config (0 turns the tier off)
+LOCAL_CACHE_TTL = 30
+LOCAL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Bumped whenever the shape of cached task or workload data changes, so
+# entries written by older code are ignored instead of served
+CACHE_FORMAT_VERSION = 1
+
+def get_generation_key(department=None):
+    return f"{GENERATION_KEY}:{department or 'all'}"
+
+def get_revision_key(department=None):
+    return f"{REVISION_KEY}:{department or 'all'}"
+
+def get_counters(department=None):
+    """(global generation, department generation, department revision) in one round trip"""
+    cache = frappe.cache()
+    values = cache.mget([
+        cache.make_key(GENERATION_KEY),
+        cache.make_key(get_generation_key(department)),
+        cache.make_key(get_revision_key(department))
+    ])
+    return tuple(cint(value) for value in values)
+
+def bump_generation(department=None, everything=False):
+    """Retire every cached entry of a department, or of all planner caches"""
+    cache = frappe.cache()
+    cache.incr(cache.make_key(GENERATION_KEY if everything else get_generation_key(department)))
+
+def bump_revisions(departments):
+    cache = frappe.cache()
+    pipeline = cache.pipeline()
+    for department in departments:
+        pipeline.incr(cache.make_key(get_revision_key(department)))
+    pipeline.execute()
+
+def get_namespace_key(kind, department=None, counters=None):
+    """Redis hash holding every cached variant of `kind` for a department"""
+    site_generation, department_generation = (counters or get_counters(department))[:2]
+    namespace = CACHE_KEYS[kind].format(department=department or 'all')
+    return f"{namespace}|g{site_generation}.{department_generation}"
+
+def get_entry_field(*parts):
+    """Hash field for one variant (date window, mode, field set, ...)"""
+    return '|'.join('' if part is None else str(part) for part in parts)
+
+def get_window(start_date=None, end_date=None):
+    """Cache key part for a date window; open windows depend on today"""
+    window = [str(getdate(start_date)) if start_date else '', str(getdate(end_date)) if end_date else '']
+    if not (start_date and end_date):
+        window.append(str(getdate()))
+    return '_'.join(window)
+
+def get_fields_key(fields=None):
+    return ','.join(sorted(fields)) if fields else '*'
+
+def get_entry(kind, key, field):
+    """Get (entry, pickled size) for a variant of namespace `key`; (None, 0) when missing, stamped stale or dead
+
+    Entries are {"stamp", "expires", "data"} dicts; the stamp must match
+    the current one for the namespace. Expiry is left to the caller so
+    expired entries can still be served while they are revalidated; dead
+    ones, past the stale-while-revalidate window too, are deleted here.
+    Reads skip the request-local copy frappe.cache() keeps of hash values;
+    repeated reads are served by the process-local tier instead.
+    """
+    cache = frappe.cache()
+    redis_key = cache.make_key(key)
+    value = redis.Redis.hget(cache, redis_key, field)
+    if not value:
+        return None, 0
+
+    entry = pickle.loads(value)
+    if entry.get('stamp') != get_stamp(kind) or is_dead(entry):
+        # A write racing this delete only costs a recompute
+        redis.Redis.hdel(cache, redis_key, field)
+        return None, 0
+    return entry, len(value)
+
+def set_entry(kind, key, field, data, department=None, revision=None):
+    """Store data for a variant of namespace `key` with the stamp and CACHE_EXPIRY TTL
+
+    With `revision` (the department revision read before the data was
+    loaded) the write is a transaction watching that revision: if an
+    invalidation ran in between, nothing is written, since the data may
+    predate the change. Returns (entry, pickled size) like get_entry;
+    (None, 0) when the write was skipped.
+    """
+    ttl = CACHE_EXPIRY[kind]
+    cache = frappe.cache()
+    entry = {
+        'stamp': get_stamp(kind),
+        'expires': time.time() + ttl,
+        'data': data
+    }
+    value = pickle.dumps(entry)
+    redis_key = cache.make_key(key)
+    revision_key = cache.make_key(get_revision_key(department))
+
+    with cache.pipeline() as pipeline:
+        try:
+            if revision is not None:
+                pipeline.watch(revision_key)
+                if cint(pipeline.get(revision_key)) != revision:
+                    return None, 0
+            pipeline.multi()
+            pipeline.hset(redis_key, field, value)
+            # Fields have no TTL of their own: dead ones are deleted when
+            # read or by prune_dead_entries, and the hash goes once its
+            # newest entry is dead
+            pipeline.expire(redis_key, ttl + get_stale_seconds())
+            pipeline.execute()
+        except redis.exceptions.WatchError:
+            return None, 0
+    return entry, len(value)
+
+def get_stamp(kind):
+    """Version stamp entries of a namespace must carry to be served"""
+    return CACHE_FORMAT_VERSION
+
+def get_stale_seconds():
+    """How long past expiry an entry may be served while it is recomputed
+
+    Off unless `planner_cache_stale_seconds` is set in site config.
+    """
+    return cint(frappe.conf.get('planner_cache_stale_seconds'))
+
+def is_dead(entry, now=None):
+    """Whether an entry is past expiry and its stale-while-revalidate window"""
+    return entry['expires'] + get_stale_seconds() < (now or time.time())
+
+def prune_dead_entries():
+    """Delete dead and stale-stamped variants from every planner namespace; scheduled hourly
+
+    Each write refreshes the TTL of its whole namespace, so a busy
+    namespace keeps variants nobody reads again (open windows of past
+    days, field sets no longer requested) until they are pruned here.
+    """
+    cache = frappe.cache()
+    now = time.time()
+    for kind in ('PLANNER_TASKS', 'TASK_STATS', 'WORKLOAD'):
+        pattern = cache.make_key(f"{CACHE_KEYS[kind].format(department='*')}|g*")
+        for redis_key in cache.scan_iter(match=pattern, _type='hash'):
+            dead = []
+            for field, value in redis.Redis.hscan_iter(cache, redis_key):
+                entry = pickle.loads(value)
+                if entry.get('stamp') != get_stamp(kind) or is_dead(entry, now):
+                    dead.append(field)
+            if dead:
+                redis.Redis.hdel(cache, redis_key, *dead)
+
+# Process-local tier
+# ------------------
+# Keyed by the full Redis key and field, so generation bumps miss it
+# outright; targeted invalidation is seen through the department revision
+# read with the generations. Sizes are the pickled sizes from Redis.
+
+_local_cache = OrderedDict()
+_local_cache_bytes = 0
+_local_cache_lock = threading.Lock()
+
+def get_local_cache_limit():
+    limit = frappe.conf.get('planner_local_cache_bytes')
+    return LOCAL_CACHE_MAX_BYTES if limit is None else cint(limit)
+
+def get_local(local_key, revision):
+    """Get a process-local entry still valid at `revision`, or None"""
+    global _local_cache_bytes
+    with _local_cache_lock:
+        item = _local_cache.get(local_key)
+        if not item:
+            return None
+
+        entry, item_revision, valid_until, size = item
+        if item_revision != revision or valid_until < time.time():
+            del _local_cache[local_key]
+            _local_cache_bytes -= size
+            return None
+
+        _local_cache.move_to_end(local_key)
+        return entry
+
+def set_local(local_key, revision, entry, size):
+    """Keep an entry in the process-local tier, evicting least recently used ones over budget"""
+    global _local_cache_bytes
+    limit = get_local_cache_limit()
+    if size > limit:
+        return
+
+    valid_until = min(time.time() + LOCAL_CACHE_TTL, entry['expires'])
+    with _local_cache_lock:
+        previous = _local_cache.pop(local_key, None)
+        if previous:
+            _local_cache_bytes -= previous[3]
+
+        _local_cache[local_key] = (entry, revision, valid_until, size)
+        _local_cache_bytes += size
+        while _local_cache_bytes > limit:
+            _, evicted = _local_cache.popitem(last=False)
+            _local_cache_bytes -= evicted[3]
+
+def read_through(kind, department, field, loader):
+    """Serve a variant from cache, calling loader() and caching its result on a miss
+
+    Misses are single-flight: one worker holds a Redis lock per entry and
+    recomputes while the others wait for its result (or, with
+    stale-while-revalidate on, keep serving the expired entry). If the
+    holder does not finish within CACHE_LOCK_WAIT the waiter computes
+    itself. Exceptions from the loader propagate and nothing is cached.
+
+    The namespace key and department revision are read once, before
+    loading: a result computed across a generation bump lands under the
+    retired generation, and one computed across a targeted invalidation
+    is returned to this caller but not cached (see set_entry).
+
+    Hits in the process-local tier skip Redis and unpickling. Callers get a
+    shallow copy: they may replace top-level items but must not modify
+    the rows inside.
+    """
+    counters = get_counters(department)
+    key = get_namespace_key(kind, department, counters)
+    revision = counters[2]
+    local_key = (frappe.cache().make_key(key), field)
+
+    entry = get_local(local_key, revision)
+    if entry:
+        return copy.copy(entry['data'])
+
+    entry, size = get_entry(kind, key, field)
+    now = time.time()
+    if entry and entry['expires'] >= now:
+        set_local(local_key, revision, entry, size)
+        return copy.copy(entry['data'])
+
+    def load():
+        data = loader()
+        entry, size = set_entry(kind, key, field, data, department, revision)
+        if entry:
+            set_local(local_key, revision, entry, size)
+        return copy.copy(data)
+
+    stale = entry if entry and entry['expires'] + get_stale_seconds() >= now else None
+    lock = frappe.cache().lock(
+        frappe.cache().make_key(f"{key}|{field}|lock"),
+        timeout=CACHE_LOCK_TIMEOUT
     )
-    
-    return tasks
+    if lock.acquire(blocking=False):
+        try:
+            # The previous holder may have finished between our read and acquire
+            entry, size = get_entry(kind, key, field)
+            if not (entry and entry['expires'] >= time.time()):
+                return load()
+            set_local(local_key, revision, entry, size)
+            return copy.copy(entry['data'])
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                # Held past CACHE_LOCK_TIMEOUT and already taken over
+                pass
+
+    if stale:
+        return copy.copy(stale['data'])
+
+    deadline = time.time() + CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(CACHE_LOCK_POLL)
+        entry, size = get_entry(kind, key, field)
+        if entry and entry['expires'] >= time.time():
+            set_local(local_key, revision, entry, size)
+            return copy.copy(entry['data'])
+        if not lock.locked():
+            break
+
+    return load()
+
+def get_cached_tasks(department=None, start_date=None, end_date=None, fields=None,
+                     assignee=None, overlap=False, loader=None):
+    """Get formatted tasks from cache or fetch them from the database
+
+    Keyed by department, date window, overlap mode, assignee and field set.
+    """
+    if loader is None:
+        from planner.services.task_service import TaskService
+
+        loader = lambda: TaskService.fetch_all_tasks(department, start_date, end_date, assignee, overlap, fields)
+
+    field = get_entry_field(get_window(start_date, end_date), int(bool(overlap)), assignee, get_fields_key(fields))
+    return read_through('PLANNER_TASKS', department, field, loader)
+
+def get_cached_workload(department, start_date, end_date, fields, loader):
+    """Get get_workload_data output from cache or build it with loader()"""
+    field = get_entry_field(get_window(start_date, end_date), get_fields_key(fields))
+    return read_through('WORKLOAD', department, field, loader)
 
 def get_cached_stats(department=None):
     """Get task statistics from cache or compute"""
-    cache_key = CACHE_KEYS['TASK_STATS'].format(department=department or 'all')
-    stats = frappe.cache().get_value(cache_key)
-    
-    if stats is None:
-        # Cache miss - compute stats
-        stats = compute_and_cache_stats(department)
-    
-    return stats
+    return read_through('TASK_STATS', department, 'all', lambda: compute_stats(department))
 
-def compute_and_cache_stats(department=None):
-    """Compute task statistics and update cache"""
-    tasks = get_cached_tasks(department)
-    now = datetime.now()
+def compute_stats(department=None):
+    """Compute task statistics over the department's cached task set"""
+    tasks = get_cached_tasks(department, fields=['status', 'priority', 'endDate'])
+    today = getdate()
     
-    stats = {
+    return {
         'total': len(tasks),
-        'completed': sum(1 for task in tasks if task.status == 'Completed'),
-        'in_progress': sum(1 for task in tasks if task.status == 'Working'),
+        'completed': sum(1 for task in tasks if task['status'] == 'Completed'),
+        'in_progress': sum(1 for task in tasks if task['status'] == 'Working'),
         'overdue': sum(1 for task in tasks if (
-            task.status != 'Completed' and 
-            task.exp_end_date and 
-            datetime.strptime(str(task.exp_end_date), '%Y-%m-%d') < now
+            task['status'] != 'Completed' and
+            task['endDate'] and
+            getdate(task['endDate']) < today
         )),
         'by_priority': {
-            'high': sum(1 for task in tasks if task.priority == 'High'),
-            'medium': sum(1 for task in tasks if task.priority == 'Medium'),
-            'low': sum(1 for task in tasks if task.priority == 'Low')
+            'high': sum(1 for task in tasks if task['priority'] == 'High'),
+            'medium': sum(1 for task in tasks if task['priority'] == 'Medium'),
+            'low': sum(1 for task in tasks if task['priority'] == 'Low')
         },
-        'last_updated': str(now)
+        'last_updated': str(datetime.now())
     }
-    
-    cache_key = CACHE_KEYS['TASK_STATS'].format(department=department or 'all')
-    frappe.cache().set_value(
-        cache_key,
-        stats,
-        expires_in_sec=CACHE_EXPIRY['TASK_STATS']
-    )
-    
-    return stats
+
+def get_preferences_key(user):
+    """Preferences key; carries the global generation like every planner key"""
+    site_generation = get_counters()[0]
+    return f"{CACHE_KEYS['USER_PREFERENCES'].format(user=user)}|g{site_generation}"
 
 def get_user_preferences(user=None):
     """Get user preferences from cache"""
     if not user:
         user = frappe.session.user
     
-    cache_key = CACHE_KEYS['USER_PREFERENCES'].format(user=user)
+    cache_key = get_preferences_key(user)
     prefs = frappe.cache().get_value(cache_key)
     
     if prefs is None:
@@ -125,7 +410,7 @@ def fetch_and_cache_preferences(user):
     except frappe.DoesNotExistError:
         prefs = default_prefs
     
-    cache_key = CACHE_KEYS['USER_PREFERENCES'].format(user=user)
+    cache_key = get_preferences_key(user)
     frappe.cache().set_value(
         cache_key,
         prefs,
@@ -135,33 +420,199 @@ def fetch_and_cache_preferences(user):
     return prefs
 
 def clear_task_cache(department=None):
-    """Clear task-related caches"""
-    cache_key = CACHE_KEYS['PLANNER_TASKS'].format(department=department or 'all')
-    stats_key = CACHE_KEYS['TASK_STATS'].format(department=department or 'all')
-    
-    frappe.cache().delete_value(cache_key)
-    frappe.cache().delete_value(stats_key)
+    """Clear task-related caches of a department (or the all-departments namespace)"""
+    bump_generation(department)
 
 def clear_user_cache(user=None):
     """Clear user-specific cache"""
     if not user:
         user = frappe.session.user
     
-    cache_key = CACHE_KEYS['USER_PREFERENCES'].format(user=user)
+    cache_key = get_preferences_key(user)
     frappe.cache().delete_value(cache_key)
 
 def invalidate_all_caches():
-    """Invalidate all planner-related caches"""
-    departments = frappe.get_all('Department', pluck='name')
-    
-    # Clear task caches for all departments
-    for dept in departments:
-        clear_task_cache(dept)
-    
-    # Clear global task cache
-    clear_task_cache()
-    
-    # Clear user preference caches
-    users = frappe.get_all('User', pluck='name')
-    for user in users:
-        clear_user_cache(user)
+    """Invalidate all planner-related caches, preferences included, with one INCR"""
+    bump_generation(everything=True)
+
+# Invalidation
+# ------------
+# Doc events drop only the entries a change can affect: the departments
+# involved (plus the all-departments namespace), entries whose date window
+# overlaps the changed span and, for assignee-scoped task sets, the
+# assignees involved. Tasks missing a start or end date only match
+# windows with an open bound, so an undated side adds those windows
+# rather than every window. Deletes run after commit and are bracketed by
+# department revision bumps: a reader that loaded before the change sees
+# the first bump and skips its write (see set_entry), and process-local
+# copies taken before the deletes are dropped by the second.
+
+def run_after_commit(fn, *args):
+    frappe.db.after_commit.add(lambda: fn(*args))
+
+def parse_window(field):
+    """(start, end) dates of an entry's window; None for an open end"""
+    start, end = field.split('|', 1)[0].split('_')[:2]
+    return getdate(start) if start else None, getdate(end) if end else None
+
+def window_overlaps(field, start_date=None, end_date=None, undated=False):
+    """Whether an entry's window can include a span; an unknown span matches all
+
+    With `undated`, tasks missing a date are involved too: they match any
+    window with an open bound, and a missing span then matches nothing else.
+    """
+    window_start, window_end = parse_window(field)
+    if undated and (window_start is None or window_end is None):
+        return True
+    if not start_date or not end_date:
+        return not undated
+    return (
+        (window_start is None or window_start <= getdate(end_date)) and
+        (window_end is None or window_end >= getdate(start_date))
+    )
+
+def invalidate_entries(kind, departments, start_date=None, end_date=None, assignees=None, undated=False):
+    """Delete entries of `kind` for departments and 'all' whose window overlaps a span
+
+    `undated` also drops open windows; see window_overlaps.
+
+    With `assignees`, PLANNER_TASKS entries scoped to any other assignee
+    are kept.
+    """
+    cache = frappe.cache()
+    departments = set(departments) | {None}
+    bump_revisions(departments)
+    for department in departments:
+        key = get_namespace_key(kind, department)
+        stale = []
+        for field in cache.hkeys(key):
+            field = field.decode() if isinstance(field, bytes) else field
+            if not window_overlaps(field, start_date, end_date, undated):
+                continue
+            if assignees is not None and kind == 'PLANNER_TASKS':
+                entry_assignee = field.split('|')[2]
+                if entry_assignee and entry_assignee not in assignees:
+                    continue
+            stale.append(field)
+        if stale:
+            cache.hdel(key, stale)
+    bump_revisions(departments)
+
+def get_task_scope(task):
+    """(department, start, end, primary assignee) of a task row or document"""
+    if not task:
+        return None
+    assignee = None
+    if task.get('_assign'):
+        try:
+            users = frappe.parse_json(task.get('_assign'))
+            assignee = users[0] if users else None
+        except Exception:
+            pass
+    return task.get('department'), task.get('exp_start_date'), task.get('exp_end_date'), assignee
+
+def invalidate_task_changes(changes):
+    """Invalidate cached entries affected by (old, new) task pairs after commit
+
+    Either side may be None for inserts and deletes. Used by doc events and
+    by the bulk and fast write paths that bypass them.
+    """
+    scopes = [get_task_scope(task) for pair in changes for task in pair if task]
+    if not scopes:
+        return
+
+    departments = {scope[0] for scope in scopes}
+    assignees = {scope[3] for scope in scopes if scope[3]}
+    dates = [getdate(d) for scope in scopes for d in scope[1:3] if d]
+    # An undated side reaches open windows only, on top of the dated span
+    undated = not all(scope[1] and scope[2] for scope in scopes)
+    start_date = min(dates) if dates else None
+    end_date = max(dates) if dates else None
+
+    run_after_commit(_invalidate_tasks, departments, start_date, end_date, assignees, undated)
+
+def _invalidate_tasks(departments, start_date, end_date, assignees, undated=False):
+    departments = set(departments) | {None}
+    bump_revisions(departments)
+    for department in departments:
+        frappe.cache().delete_value(get_namespace_key('TASK_STATS', department))
+    invalidate_entries('PLANNER_TASKS', departments, start_date, end_date, assignees, undated)
+    invalidate_entries('WORKLOAD', departments, start_date, end_date, undated=undated)
+
+def invalidate_workload(departments, start_date=None, end_date=None):
+    """Invalidate workload entries of departments after commit"""
+    run_after_commit(invalidate_entries, 'WORKLOAD', set(departments), start_date, end_date)
+
+def on_atlas_task_change(doc, method=None):
+    """Hooked to Atlas Task on_update/on_trash"""
+    try:
+        if method == "on_trash":
+            invalidate_task_changes([(doc, None)])
+        else:
+            invalidate_task_changes([(doc.get_doc_before_save(), doc)])
+    except Exception as e:
+        frappe.logger().error(f"Error invalidating task cache for {doc.name}: {str(e)}")
+
+def on_employee_change(doc, method=None):
+    """Employees feed the workload directory and capacity; hooked to Employee events"""
+    try:
+        before = doc.get_doc_before_save()
+        invalidate_workload({doc.department, before.department if before else None})
+    except Exception as e:
+        frappe.logger().error(f"Error invalidating workload cache for {doc.name}: {str(e)}")
+
+def on_user_change(doc, method=None):
+    """Hooked to User on_update/on_trash
+
+    Names and images feed the workload directory; a deleted user also
+    turns into "Unassigned" on every task assigned to them.
+    """
+    try:
+        departments = set(frappe.get_all("Employee", filters={"user_id": doc.name}, pluck="department"))
+        if departments:
+            invalidate_workload(departments)
+
+        if method == "on_trash":
+            task_departments = set(frappe.get_all(
+                "Atlas Task Assignment", filters={"assignee": doc.name}, pluck="department"
+            ))
+            if task_departments:
+                run_after_commit(_invalidate_tasks, task_departments, None, None, {doc.name})
+    except Exception as e:
+        frappe.logger().error(f"Error invalidating cache for user {doc.name}: {str(e)}")
+
+def on_leave_application_change(doc, method=None):
+    """Leaves reduce capacity within their dates; hooked to Leave Application events"""
+    try:
+        department = doc.get("department") or frappe.db.get_value("Employee", doc.employee, "department")
+        invalidate_workload({department}, doc.from_date, doc.to_date)
+    except Exception as e:
+        frappe.logger().error(f"Error invalidating workload cache for {doc.name}: {str(e)}")
+
+def on_holiday_list_change(doc, method=None):
+    """Hooked to Holiday List on_update/on_trash
+
+    Only departments with employees on this list, directly or through
+    their company's default, are affected.
+    """
+    try:
+        departments = {row[0] for row in frappe.db.sql("""
+            SELECT DISTINCT e.department
+            FROM `tabEmployee` e
+            LEFT JOIN `tabCompany` c ON c.name = e.company
+            WHERE COALESCE(NULLIF(e.holiday_list, ''), c.default_holiday_list) = %(holiday_list)s
+        """, {"holiday_list": doc.name})}
+        if not departments:
+            return
+
+        before = doc.get_doc_before_save()
+        starts = [d for d in (doc.get("from_date"), before and before.get("from_date")) if d]
+        ends = [d for d in (doc.get("to_date"), before and before.get("to_date")) if d]
+        invalidate_workload(
+            departments,
+            min(getdate(d) for d in starts) if starts else None,
+            max(getdate(d) for d in ends) if ends else None
+        )
+    except Exception as e:
+        frappe.logger().error(f"Error invalidating workload cache for {doc.name}: {str(e)}")
+
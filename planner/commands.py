@@ -0,0 +1,53 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-planner-load")
+@click.option("--assignee", help="Only rebuild rows for this user")
+@pass_context
+def rebuild_planner_load(context, assignee=None):
+	"""Recompute the Planner Load table from Atlas Tasks"""
+	import frappe
+	from planner.services.load_service import LoadService
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		result = LoadService.rebuild(assignee)
+		frappe.db.commit()
+		click.echo(f"Rebuilt planner load from {result['tasks']} tasks ({result['rows']} rows)")
+	finally:
+		frappe.destroy()
+
+
+@click.command("explain-planner-queries")
+@click.option("--department", help="Department used to parameterise the queries")
+@pass_context
+def explain_planner_queries(context, department=None):
+	"""Run EXPLAIN on each planner query and report full table scans"""
+	import frappe
+	from planner.query_audit import explain_planner_queries as explain
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		report = explain(department)
+	finally:
+		frappe.destroy()
+
+	full_scans = 0
+	for entry in report:
+		status = "FULL SCAN on " + ", ".join(entry["full_scans"]) if entry["full_scans"] else "ok"
+		full_scans += bool(entry["full_scans"])
+		click.echo(f"[{status}] {entry['label']}: {entry['query'][:160]}")
+		for row in entry["plan"]:
+			click.echo(f"    {row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}")
+
+	click.echo(f"{len(report)} queries checked, {full_scans} with full scans")
+	if full_scans:
+		raise SystemExit(1)
+
+
+commands = [rebuild_planner_load, explain_planner_queries]
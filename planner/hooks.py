@@ -133,6 +133,86 @@ app_license = "mit"
 # 	}
 # }
 
+doc_events = {
+	"Atlas Task": {
+		"on_update": [
+			"planner.services.load_service.on_atlas_task_change",
+			"planner.services.assignment_service.on_atlas_task_change",
+			"planner.services.task_service.on_atlas_task_change",
+			"planner.services.sync_service.on_atlas_task_change",
+			"planner.services.version_service.bump_data_version",
+			"planner.realtime.on_atlas_task_change",
+			"planner.cache.on_atlas_task_change",
+		],
+		"on_trash": [
+			"planner.services.load_service.on_atlas_task_change",
+			"planner.services.assignment_service.on_atlas_task_change",
+			"planner.services.sync_service.on_atlas_task_change",
+			"planner.services.version_service.bump_data_version",
+			"planner.realtime.on_atlas_task_change",
+			"planner.cache.on_atlas_task_change",
+		],
+	},
+	"ToDo": {
+		"on_update": "planner.services.assignment_service.on_todo_change",
+		"on_trash": "planner.services.assignment_service.on_todo_change",
+	},
+	"Employee": {
+		"on_update": [
+			"planner.services.workload_service.clear_employee_directory",
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_employee_change",
+			"planner.services.load_service.on_employee_change",
+		],
+		"on_trash": [
+			"planner.services.workload_service.clear_employee_directory",
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_employee_change",
+			"planner.services.load_service.on_employee_change",
+		],
+	},
+	"User": {
+		"on_update": [
+			"planner.services.workload_service.clear_employee_directory",
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_user_change",
+		],
+		"on_trash": [
+			"planner.services.workload_service.clear_employee_directory",
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_user_change",
+		],
+	},
+	"Leave Application": {
+		"on_submit": [
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_leave_application_change",
+		],
+		"on_cancel": [
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_leave_application_change",
+		],
+		"on_update_after_submit": [
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_leave_application_change",
+		],
+	},
+	"Holiday List": {
+		"on_update": [
+			"planner.services.calendar_service.clear_holiday_calendar_cache",
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_holiday_list_change",
+			"planner.services.load_service.on_holiday_list_change",
+		],
+		"on_trash": [
+			"planner.services.calendar_service.clear_holiday_calendar_cache",
+			"planner.services.version_service.bump_data_version",
+			"planner.cache.on_holiday_list_change",
+			"planner.services.load_service.on_holiday_list_change",
+		],
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -154,6 +234,15 @@ app_license = "mit"
 # 	],
 # }
 
+scheduler_events = {
+	"hourly": [
+		"planner.cache.prune_dead_entries",
+	],
+	"daily": [
+		"planner.services.sync_service.prune_sync_log",
+	],
+}
+
 # Testing
 # -------
 
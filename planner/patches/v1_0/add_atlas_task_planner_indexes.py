@@ -0,0 +1,5 @@
+from planner.planner.doctype.atlas_task.atlas_task import on_doctype_update
+
+
+def execute():
+	on_doctype_update()
@@ -0,0 +1,7 @@
+import frappe
+
+
+def execute():
+	# Sites that already ran add_atlas_task_planner_indexes only lack these
+	frappe.db.add_index("Atlas Task", ["department", "modified"])
+	frappe.db.add_index("Atlas Task", ["modified", "name"])
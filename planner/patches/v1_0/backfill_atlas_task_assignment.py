@@ -0,0 +1,7 @@
+import frappe
+from planner.services.assignment_service import AssignmentService
+
+
+def execute():
+	frappe.reload_doc("planner", "doctype", "atlas_task_assignment")
+	AssignmentService.rebuild()
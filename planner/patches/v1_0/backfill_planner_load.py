@@ -0,0 +1,7 @@
+import frappe
+from planner.services.load_service import LoadService
+
+
+def execute():
+	frappe.reload_doc("planner", "doctype", "planner_load")
+	LoadService.rebuild()
@@ -34,3 +34,16 @@ class AtlasTask(Document):
     def update_depends_on(self):
         # 
         pass
+
+
+def on_doctype_update():
+    # Composite indexes matching the planner query shapes (see planner.query_audit)
+    frappe.db.add_index("Atlas Task", ["department", "exp_start_date", "exp_end_date"])
+    frappe.db.add_index("Atlas Task", ["exp_start_date", "exp_end_date"])
+    frappe.db.add_index("Atlas Task", ["status", "exp_end_date"])
+    frappe.db.add_index("Atlas Task", ["creation", "name"])
+    frappe.db.add_index("Atlas Task", ["project", "creation"])
+    frappe.db.add_index("Atlas Task", ["parent_task"])
+    # Delta sync scans (see planner.services.sync_service)
+    frappe.db.add_index("Atlas Task", ["department", "modified"])
+    frappe.db.add_index("Atlas Task", ["modified", "name"])
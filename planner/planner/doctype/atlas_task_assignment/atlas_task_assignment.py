@@ -0,0 +1,15 @@
+# Copyright (c) 2026, ONFUSE AG and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AtlasTaskAssignment(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique("Atlas Task Assignment", ["task", "assignee"], constraint_name="unique_task_assignee")
+	frappe.db.add_index("Atlas Task Assignment", ["assignee", "position", "task"])
+	frappe.db.add_index("Atlas Task Assignment", ["department", "assignee"])
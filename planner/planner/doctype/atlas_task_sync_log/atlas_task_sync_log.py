@@ -0,0 +1,14 @@
+# Copyright (c) 2026, ONFUSE AG and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AtlasTaskSyncLog(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Atlas Task Sync Log", ["department", "creation"])
+	frappe.db.add_index("Atlas Task Sync Log", ["creation"])
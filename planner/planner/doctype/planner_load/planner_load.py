@@ -0,0 +1,13 @@
+# Copyright (c) 2026, ONFUSE AG and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class PlannerLoad(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique("Planner Load", ["assignee", "load_date"], constraint_name="unique_assignee_load_date")
@@ -0,0 +1,64 @@
+import frappe
+from frappe.utils import add_days, getdate
+
+PLANNER_TABLES = ("tabAtlas Task", "tabAtlas Task Assignment", "tabPlanner Load")
+
+
+def get_planner_query_runs(department=None):
+    """Planner entry points whose SQL is audited, as (label, callable) pairs"""
+    from planner import api
+    from planner.services.task_service import TaskService
+    from planner.services.workload_service import WorkloadService
+
+    start_date = getdate()
+    end_date = add_days(start_date, 30)
+
+    return [
+        # The uncached loader, so cache hits do not hide the query
+        ("TaskService.fetch_all_tasks", lambda: TaskService.fetch_all_tasks(department, start_date, end_date)),
+        ("planner_get_backlog", lambda: api.planner_get_backlog()),
+        ("list_tasks", lambda: api.list_tasks()),
+        ("get_workload_heatmap", lambda: WorkloadService.get_workload_heatmap(department, start_date, end_date)),
+    ]
+
+
+def capture_queries(fn):
+    """Run fn and return the SELECT statements it sent to planner tables"""
+    db = frappe.db
+    original_sql = db.sql
+    captured = []
+
+    def recording_sql(query, values=(), *args, **kwargs):
+        text = str(query)
+        if text.lstrip().upper().startswith("SELECT") and any(t in text for t in PLANNER_TABLES):
+            captured.append((text, values))
+        return original_sql(query, values, *args, **kwargs)
+
+    db.sql = recording_sql
+    try:
+        fn()
+    finally:
+        del db.sql
+
+    return captured
+
+
+def explain_planner_queries(department=None):
+    """EXPLAIN every planner query and report full scans on planner tables"""
+    report = []
+
+    for label, fn in get_planner_query_runs(department):
+        for query, values in capture_queries(fn):
+            plan = frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True)
+            full_scans = [
+                row.get("table") for row in plan
+                if (row.get("type") or "").upper() == "ALL"
+            ]
+            report.append({
+                "label": label,
+                "query": " ".join(query.split()),
+                "plan": plan,
+                "full_scans": full_scans
+            })
+
+    return report
@@ -1,35 +1,156 @@
+import time
 import frappe
+from frappe.realtime import get_doctype_room
+from frappe.utils import get_datetime, now_datetime
 
-def emit_task_update(task):
-    """Emit real-time update for task changes"""
+# Updates reaching Redis within this many seconds of each other are sent
+# to a department as one batch_task_update
+REALTIME_COALESCE_WINDOW = 0.5
+
+PENDING_CACHE_KEY = "planner_realtime_pending"
+FLUSH_FLAG_CACHE_KEY = "planner_realtime_flush"
+
+# Buffer key for tasks without a department
+NO_DEPARTMENT = "__none__"
+
+
+def get_task_version(task=None):
+    """Monotonic per-task version: `modified` in microseconds since the epoch
+
+    Clients keep the highest version seen per task and ignore older events.
+    Without a task (deletions, or changes written with
+    update_modified=False) the current time is used.
+    """
+    modified = get_datetime(task.modified) if task and task.get("modified") else now_datetime()
+    return int(modified.timestamp() * 1_000_000)
+
+def get_task_payload(task, assignee=None, deleted=False, stamp_now=False):
+    """Realtime payload describing one task change
+
+    Carries the task formatted like TaskService.format_task so clients can
+    patch their state without refetching. `stamp_now` versions the change
+    by the emit time, for writes that leave `modified` as it was.
+    """
+    # Imported here: task_service imports this module
+    from planner.services.task_service import TaskService
+
+    if deleted:
+        return {'task_id': task.name, 'deleted': True, 'version': get_task_version()}
+    return {
+        'task_id': task.name,
+        'task': TaskService.format_task(task, assignee),
+        'version': get_task_version(None if stamp_now else task)
+    }
+
+def emit_task_update(task, stamp_now=False):
+    """Queue a real-time update for a task change"""
+    queue_task_updates([task], stamp_now=stamp_now)
+
+def emit_batch_update(tasks):
+    """Queue real-time updates for many task changes"""
+    queue_task_updates(tasks)
+
+def emit_task_delete(task, department=None):
+    """Queue a real-time removal of a task from a department's view"""
+    queue_task_updates([task], deleted=True, department=department)
+
+def queue_task_updates(tasks, deleted=False, department=None, stamp_now=False):
+    """Stage task updates for publishing once the transaction commits
+
+    Updates are grouped by department and de-duplicated per task (the
+    latest change wins). Nothing is sent if the transaction rolls back.
+    """
     try:
-        frappe.publish_realtime(
-            'task_update',
-            {
-                'task_id': task.name,
-                'status': task.status,
-                'assignee': task._assign,
-                'modified': str(task.modified)
-            },
-            user=frappe.session.user
-        )
+        from planner.services.task_service import TaskService
+
+        pending = frappe.flags.planner_realtime_pending
+        if pending is None:
+            pending = frappe.flags.planner_realtime_pending = {}
+            frappe.db.after_commit.add(flush_pending)
+            frappe.db.after_rollback.add(discard_pending)
+
+        assignees = {} if deleted else TaskService.resolve_primary_assignees(tasks)
+        for task in tasks:
+            room = department or task.get("department") or NO_DEPARTMENT
+            pending.setdefault(room, {})[task.name] = get_task_payload(
+                task, assignees.get(task.name, "Unassigned"), deleted, stamp_now
+            )
     except Exception as e:
-        frappe.logger().error(f"Error emitting task update: {str(e)}")
+        frappe.logger().error(f"Error queueing task update: {str(e)}")
 
-def emit_batch_update(tasks):
-    """Emit real-time update for batch task changes"""
+def flush_pending():
+    """Hand this transaction's updates on to the per-department coalescer"""
+    pending = frappe.flags.planner_realtime_pending or {}
+    frappe.flags.planner_realtime_pending = None
+
+    for department, updates in pending.items():
+        try:
+            if not REALTIME_COALESCE_WINDOW:
+                publish_department(department, list(updates.values()))
+            else:
+                stage_department(department, updates)
+        except Exception as e:
+            frappe.logger().error(f"Error publishing task updates for {department}: {str(e)}")
+            publish_department(department, list(updates.values()))
+
+def discard_pending():
+    """Drop updates staged by a transaction that rolled back"""
+    frappe.flags.planner_realtime_pending = None
+
+def stage_department(department, updates):
+    """Merge updates into the department's Redis buffer and schedule one flush
+
+    The first writer in a window sets the flush flag and enqueues
+    flush_department; later writers only add to the buffer.
+    """
+    cache = frappe.cache()
+    pending_key = f"{PENDING_CACHE_KEY}:{department}"
+    for task_id, payload in updates.items():
+        cache.hset(pending_key, task_id, payload)
+
+    flag = cache.make_key(f"{FLUSH_FLAG_CACHE_KEY}:{department}")
+    if cache.set(flag, 1, nx=True, ex=max(int(REALTIME_COALESCE_WINDOW * 10), 5)):
+        frappe.enqueue("planner.realtime.flush_department", queue="short", department=department)
+
+def flush_department(department):
+    """Publish everything buffered for a department as one batch event; runs as a job"""
+    time.sleep(REALTIME_COALESCE_WINDOW)
+
+    cache = frappe.cache()
+    cache.delete_value(f"{FLUSH_FLAG_CACHE_KEY}:{department}")
+
+    # Renaming takes the buffer atomically; writes after this start a new one
+    taken_key = f"{PENDING_CACHE_KEY}:{department}:{frappe.generate_hash(length=8)}"
     try:
-        updates = [{
-            'task_id': task.name,
-            'status': task.status,
-            'assignee': task._assign,
-            'modified': str(task.modified)
-        } for task in tasks]
-        
-        frappe.publish_realtime(
-            'batch_task_update',
-            {'updates': updates},
-            user=frappe.session.user
-        )
+        cache.rename(cache.make_key(f"{PENDING_CACHE_KEY}:{department}"), cache.make_key(taken_key))
+    except Exception:
+        return
+
+    updates = cache.hgetall(taken_key)
+    cache.delete_value(taken_key)
+    if updates:
+        publish_department(department, list(updates.values()))
+
+def publish_department(department, updates):
+    """Send a department's updates as one batch_task_update
+
+    Published on the Atlas Task doctype room, which only users with read
+    permission on Atlas Task can join (payloads carry full tasks); clients
+    drop batches for departments they are not showing.
+    """
+    try:
+        message = {'department': None if department == NO_DEPARTMENT else department, 'updates': updates}
+        frappe.publish_realtime('batch_task_update', message, room=get_doctype_room('Atlas Task'))
     except Exception as e:
         frappe.logger().error(f"Error emitting batch update: {str(e)}")
+
+def on_atlas_task_change(doc, method=None):
+    """Queue realtime updates; hooked to Atlas Task on_update/on_trash"""
+    if method == "on_trash":
+        emit_task_delete(doc)
+        return
+
+    before = doc.get_doc_before_save()
+    if before and before.department != doc.department:
+        emit_task_delete(doc, department=before.department or NO_DEPARTMENT)
+    emit_task_update(doc)
@@ -0,0 +1,149 @@
+import frappe
+from frappe.utils import now_datetime
+from .load_service import LoadService
+from .version_service import bump_data_version
+from ..realtime import emit_task_update
+from ..cache import invalidate_task_changes
+
+ASSIGNMENT_FIELDS = [
+    "name", "task", "assignee", "department", "position",
+    "creation", "modified", "owner", "modified_by"
+]
+
+
+class AssignmentService:
+    """Keeps the Atlas Task Assignment index in sync with `_assign`
+
+    `_assign` stays the source of truth (it is what Frappe's assign_to
+    writes); the side table makes "tasks for assignee X" and "unassigned
+    tasks" indexed lookups instead of scans over the JSON column.
+    """
+
+    @staticmethod
+    def parse_assign(assign):
+        """Parse an `_assign` value into a de-duplicated list of users"""
+        if not assign:
+            return []
+        try:
+            users = frappe.parse_json(assign) if isinstance(assign, str) else assign
+        except Exception:
+            return []
+        return list(dict.fromkeys(user for user in users or [] if user))
+
+    @staticmethod
+    def sync_tasks(tasks):
+        """Rewrite assignment rows for tasks with name, _assign and department"""
+        if not tasks:
+            return
+
+        frappe.db.delete("Atlas Task Assignment", {"task": ["in", [task.name for task in tasks]]})
+
+        now = now_datetime()
+        user = frappe.session.user
+        values = [
+            (frappe.generate_hash(length=10), task.name, assignee, task.department,
+             position, now, now, user, user)
+            for task in tasks
+            for position, assignee in enumerate(AssignmentService.parse_assign(task._assign))
+        ]
+
+        if values:
+            frappe.db.bulk_insert("Atlas Task Assignment", ASSIGNMENT_FIELDS, values, ignore_duplicates=True)
+
+    @staticmethod
+    def get_primary_assignee(task_name):
+        """Get the indexed primary assignee of a task, or None"""
+        return frappe.db.get_value(
+            "Atlas Task Assignment", {"task": task_name, "position": 0}, "assignee"
+        )
+
+    @staticmethod
+    def get_task_names(assignee, primary_only=True):
+        """Get names of tasks assigned to a user via the assignment index"""
+        filters = {"assignee": assignee}
+        if primary_only:
+            filters["position"] = 0
+        return frappe.get_all("Atlas Task Assignment", filters=filters, pluck="task")
+
+    @staticmethod
+    def unassigned_condition(alias="`tabAtlas Task`"):
+        """SQL condition matching tasks without any assignment row"""
+        return f"""NOT EXISTS (
+            SELECT 1 FROM `tabAtlas Task Assignment` ata
+            WHERE ata.task = {alias}.name
+        )"""
+
+    @staticmethod
+    def rebuild():
+        """Rebuild the whole assignment index from `_assign`"""
+        frappe.db.sql("DELETE FROM `tabAtlas Task Assignment`")
+        tasks = frappe.get_all(
+            "Atlas Task",
+            filters={"_assign": ["is", "set"]},
+            fields=["name", "_assign", "department"]
+        )
+        for i in range(0, len(tasks), 1000):
+            AssignmentService.sync_tasks(tasks[i:i + 1000])
+        return len(tasks)
+
+
+def on_atlas_task_change(doc, method=None):
+    """Sync the assignment index; hooked to Atlas Task on_update/on_trash"""
+    try:
+        if method == "on_trash":
+            frappe.db.delete("Atlas Task Assignment", {"task": doc.name})
+            return
+
+        before = doc.get_doc_before_save()
+        if before and before._assign == doc._assign and before.department == doc.department:
+            return
+
+        AssignmentService.sync_tasks([doc])
+    except Exception as e:
+        frappe.logger().error(f"Error syncing assignments for {doc.name}: {str(e)}")
+
+
+def on_todo_change(doc, method=None):
+    """Sync after Frappe's assign_to updates `_assign`; hooked to ToDo events
+
+    assign_to writes `_assign` with a direct column update, so Atlas Task
+    document events never fire; the planner load is moved here as well
+    when the primary assignee changes.
+    """
+    if doc.reference_type != "Atlas Task" or not doc.reference_name:
+        return
+
+    try:
+        task = frappe.db.get_value(
+            "Atlas Task",
+            doc.reference_name,
+            [
+                "name", "_assign", "department", "exp_start_date", "exp_end_date", "expected_time",
+                "subject", "status", "priority", "project", "description", "color", "progress", "modified"
+            ],
+            as_dict=True
+        )
+        if not task:
+            return
+
+        # Imported here: sync_service depends on task_service, which imports this module
+        from .sync_service import log_task_change
+
+        old_primary = AssignmentService.get_primary_assignee(task.name)
+        AssignmentService.sync_tasks([task])
+        log_task_change(task.name, task.department, "Changed")
+        bump_data_version()
+        # assign_to writes `_assign` without touching `modified`
+        emit_task_update(task, stamp_now=True)
+
+        new_users = AssignmentService.parse_assign(task._assign)
+        new_primary = new_users[0] if new_users else None
+        if old_primary != new_primary:
+            old_task = frappe._dict(task, _assign=frappe.as_json([old_primary]) if old_primary else None)
+            invalidate_task_changes([(old_task, task)])
+            LoadService.apply_task_change(
+                LoadService.get_task_snapshot(old_task),
+                LoadService.get_task_snapshot(task)
+            )
+    except Exception as e:
+        frappe.logger().error(f"Error syncing assignments for {doc.reference_name}: {str(e)}")
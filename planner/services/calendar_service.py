@@ -0,0 +1,188 @@
+import bisect
+import importlib.util
+import frappe
+from frappe.utils import getdate
+
+# Probed once at import instead of attempting an hrms import on every call
+HRMS_AVAILABLE = importlib.util.find_spec("hrms") is not None
+
+HOLIDAY_CALENDAR_CACHE_KEY = "planner_holiday_calendars"
+# Bounds how long a calendar compiled while a change was uncommitted can survive
+HOLIDAY_CALENDAR_CACHE_EXPIRY = 21600  # 6 hours
+
+
+class HolidayCalendar:
+    """Compiled working-day calendar for a single holiday list
+
+    Holidays are stored as a sorted array of date ordinals restricted to
+    weekdays, so counting working days in a range is a closed-form weekday
+    count minus two binary searches.
+    """
+
+    __slots__ = ("name", "holidays")
+
+    def __init__(self, name=None, holiday_dates=()):
+        self.name = name
+        self.holidays = sorted({
+            getdate(d).toordinal() for d in holiday_dates
+            if getdate(d).weekday() < 5
+        })
+
+    @classmethod
+    def from_ordinals(cls, name, ordinals):
+        """Rebuild a calendar from already compiled holiday ordinals"""
+        calendar = cls(name)
+        calendar.holidays = list(ordinals)
+        return calendar
+
+    def count_working_days(self, start_date, end_date):
+        """Count working days between start_date and end_date inclusive"""
+        start = getdate(start_date).toordinal()
+        end = getdate(end_date).toordinal()
+        if start > end:
+            return 0
+
+        weekdays = CalendarService.count_weekdays_between(start, end)
+        holidays = bisect.bisect_right(self.holidays, end) - bisect.bisect_left(self.holidays, start)
+        return weekdays - holidays
+
+    def is_working_day(self, day):
+        """Check if a date is a weekday that is not a holiday"""
+        ordinal = getdate(day).toordinal()
+        if (ordinal + 6) % 7 >= 5:
+            return False
+        index = bisect.bisect_left(self.holidays, ordinal)
+        return index == len(self.holidays) or self.holidays[index] != ordinal
+
+
+# Calendar used for "unassigned" and employees without a holiday list
+WEEKDAY_CALENDAR = HolidayCalendar()
+
+
+def is_hrms_installed():
+    """Check whether HRMS (Leave Application etc.) is available on this site"""
+    return HRMS_AVAILABLE and "hrms" in frappe.get_installed_apps()
+
+
+def clear_holiday_calendar_cache(doc=None, method=None):
+    """Drop compiled calendars once the change commits; hooked to Holiday List on_update/on_trash
+
+    Dropping before commit would let a concurrent request recompile and
+    cache the old holidays.
+    """
+    if doc:
+        name = doc.name
+        frappe.db.after_commit.add(lambda: frappe.cache().hdel(HOLIDAY_CALENDAR_CACHE_KEY, name))
+    else:
+        frappe.db.after_commit.add(lambda: frappe.cache().delete_value(HOLIDAY_CALENDAR_CACHE_KEY))
+
+
+class CalendarService:
+    @staticmethod
+    def count_weekdays(start_date, end_date):
+        """Count Monday-Friday dates between start_date and end_date inclusive"""
+        return CalendarService.count_weekdays_between(
+            getdate(start_date).toordinal(), getdate(end_date).toordinal()
+        )
+
+    @staticmethod
+    def count_weekdays_between(start, end):
+        """Count weekdays between two date ordinals inclusive in O(1)"""
+        if start > end:
+            return 0
+
+        # date.weekday() == (ordinal + 6) % 7, so shifting by 6 lines the
+        # ordinals up with a Monday-based week starting at zero
+        def weekdays_before(shifted):
+            return (shifted // 7) * 5 + min(shifted % 7, 5)
+
+        return weekdays_before(end + 7) - weekdays_before(start + 6)
+
+    @staticmethod
+    def get_holiday_calendars(holiday_lists):
+        """Get compiled calendars for holiday list names, shared across employees
+
+        Calendars are cached by holiday list name; lists missing from the
+        cache are compiled together from a single Holiday query.
+        """
+        cache = frappe.cache()
+        calendars = {}
+        missing = []
+
+        for name in set(holiday_lists):
+            ordinals = cache.hget(HOLIDAY_CALENDAR_CACHE_KEY, name)
+            if ordinals is None:
+                missing.append(name)
+            else:
+                calendars[name] = HolidayCalendar.from_ordinals(name, ordinals)
+
+        if missing:
+            holiday_dates = {name: [] for name in missing}
+            try:
+                for row in frappe.db.sql("""
+                    SELECT parent, holiday_date
+                    FROM `tabHoliday`
+                    WHERE parenttype = 'Holiday List'
+                    AND parent IN %(lists)s
+                """, {"lists": missing}, as_dict=True):
+                    holiday_dates[row.parent].append(row.holiday_date)
+            except Exception as e:
+                frappe.logger().error(f"Error fetching holidays: {str(e)}")
+                return {**calendars, **{name: WEEKDAY_CALENDAR for name in missing}}
+
+            for name, dates in holiday_dates.items():
+                calendar = HolidayCalendar(name, dates)
+                cache.hset(HOLIDAY_CALENDAR_CACHE_KEY, name, calendar.holidays)
+                calendars[name] = calendar
+            cache.expire(cache.make_key(HOLIDAY_CALENDAR_CACHE_KEY), HOLIDAY_CALENDAR_CACHE_EXPIRY)
+
+        return calendars
+
+    @staticmethod
+    def get_employee_calendars(employee_ids):
+        """Get the HolidayCalendar of each employee (user id)
+
+        Holiday lists are resolved with one Employee/Company query; the
+        calendars themselves come from the shared holiday calendar cache.
+        """
+        user_ids = list({e for e in employee_ids if e and e != "unassigned"})
+        holiday_lists = {}
+
+        if user_ids:
+            try:
+                for row in frappe.db.sql("""
+                    SELECT
+                        e.user_id,
+                        COALESCE(NULLIF(e.holiday_list, ''), c.default_holiday_list) AS holiday_list
+                    FROM `tabEmployee` e
+                    LEFT JOIN `tabCompany` c ON c.name = e.company
+                    WHERE e.user_id IN %(user_ids)s
+                """, {"user_ids": user_ids}, as_dict=True):
+                    if row.holiday_list:
+                        holiday_lists.setdefault(row.user_id, row.holiday_list)
+            except Exception as e:
+                frappe.logger().error(f"Error resolving holiday lists: {str(e)}")
+
+        calendars = CalendarService.get_holiday_calendars(holiday_lists.values())
+
+        return {
+            employee_id: calendars.get(holiday_lists.get(employee_id), WEEKDAY_CALENDAR)
+            for employee_id in employee_ids
+        }
+
+    @staticmethod
+    def count_working_days_batch(queries):
+        """Count working days for many (employee_id, start_date, end_date) tuples
+
+        Returns a list of counts in the same order as the queries. Holiday
+        calendars are resolved once for the union of employees.
+        """
+        if not queries:
+            return []
+
+        calendars = CalendarService.get_employee_calendars([q[0] for q in queries])
+
+        return [
+            max(0, calendars[employee_id].count_working_days(start, end))
+            for employee_id, start, end in queries
+        ]
@@ -0,0 +1,280 @@
+import frappe
+from frappe.utils import getdate, now_datetime
+from datetime import date
+from .calendar_service import CalendarService, HOLIDAY_CALENDAR_CACHE_KEY
+
+LOAD_INSERT_BATCH_SIZE = 500
+
+
+class LoadService:
+    """Maintains the materialized Planner Load table (assignee x day)
+
+    Every scheduled Atlas Task with an assignee contributes its
+    expected_time spread over the assignee's working days. Document events
+    apply the difference between a task's old and new contribution, so
+    reads become an indexed range scan on (assignee, load_date).
+    """
+
+    @staticmethod
+    def get_task_snapshot(task):
+        """Extract (assignee, start, end, hours) from an Atlas Task, or None"""
+        if not task or not task.exp_start_date or not task.exp_end_date:
+            return None
+        if not task.expected_time:
+            return None
+
+        assignee = None
+        if task._assign:
+            assigned_users = frappe.parse_json(task._assign)
+            if assigned_users:
+                assignee = assigned_users[0]
+        if not assignee:
+            return None
+
+        return (
+            assignee,
+            getdate(task.exp_start_date),
+            getdate(task.exp_end_date),
+            float(task.expected_time)
+        )
+
+    @staticmethod
+    def get_contribution(snapshot, calendars):
+        """Spread a task snapshot over working days: {(assignee, ordinal): hours}"""
+        if not snapshot:
+            return {}
+
+        assignee, start_date, end_date, hours = snapshot
+        calendar = calendars[assignee]
+        working_days = calendar.count_working_days(start_date, end_date)
+        if working_days <= 0:
+            return {}
+
+        rate = hours / working_days
+        return {
+            (assignee, ordinal): rate
+            for ordinal in range(start_date.toordinal(), end_date.toordinal() + 1)
+            if calendar.is_working_day(date.fromordinal(ordinal))
+        }
+
+    @staticmethod
+    def apply_task_change(old_snapshot, new_snapshot):
+        """Apply the load delta between two task snapshots"""
+        LoadService.apply_task_changes([(old_snapshot, new_snapshot)])
+
+    @staticmethod
+    def apply_task_changes(changes):
+        """Apply the combined load delta of many (old, new) snapshot pairs
+
+        Calendars are resolved once for every assignee involved and the
+        delta is written with a single batched upsert.
+        """
+        changes = [(old, new) for old, new in changes if old != new]
+        if not changes:
+            return
+
+        assignees = [s[0] for pair in changes for s in pair if s]
+        calendars = CalendarService.get_employee_calendars(assignees)
+
+        delta = {}
+        for old_snapshot, new_snapshot in changes:
+            for sign, snapshot in ((-1, old_snapshot), (1, new_snapshot)):
+                for key, hours in LoadService.get_contribution(snapshot, calendars).items():
+                    value = delta.setdefault(key, [0.0, 0])
+                    value[0] += sign * hours
+                    value[1] += sign
+
+        LoadService.apply_delta({
+            key: value for key, value in delta.items()
+            if value[1] != 0 or abs(value[0]) > 1e-9
+        })
+
+    @staticmethod
+    def apply_delta(delta):
+        """Upsert {(assignee, ordinal): [hours, task_count]} increments"""
+        if not delta:
+            return
+
+        now = now_datetime()
+        user = frappe.session.user
+        rows = [
+            (frappe.generate_hash(length=10), assignee, date.fromordinal(ordinal),
+             hours, count, now, now, user, user)
+            for (assignee, ordinal), (hours, count) in delta.items()
+        ]
+
+        for i in range(0, len(rows), LOAD_INSERT_BATCH_SIZE):
+            batch = rows[i:i + LOAD_INSERT_BATCH_SIZE]
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch))
+            frappe.db.sql(f"""
+                INSERT INTO `tabPlanner Load`
+                    (name, assignee, load_date, allocated_hours, task_count,
+                    creation, modified, owner, modified_by)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                    allocated_hours = allocated_hours + VALUES(allocated_hours),
+                    task_count = task_count + VALUES(task_count),
+                    modified = VALUES(modified)
+            """, [value for row in batch for value in row])
+
+        frappe.db.sql("""
+            DELETE FROM `tabPlanner Load`
+            WHERE assignee IN %(assignees)s
+            AND task_count <= 0
+        """, {"assignees": list({assignee for assignee, _ in delta})})
+
+    @staticmethod
+    def get_load(assignees, start_date, end_date):
+        """Get {assignee: {date: {"hours", "tasks"}}} from the load table"""
+        if not assignees:
+            return {}
+
+        rows = frappe.db.sql("""
+            SELECT assignee, load_date, allocated_hours, task_count
+            FROM `tabPlanner Load`
+            WHERE assignee IN %(assignees)s
+            AND load_date BETWEEN %(start_date)s AND %(end_date)s
+        """, {
+            "assignees": list(assignees),
+            "start_date": getdate(start_date),
+            "end_date": getdate(end_date)
+        }, as_dict=True)
+
+        load = {assignee: {} for assignee in assignees}
+        for row in rows:
+            load[row.assignee][row.load_date] = {
+                "hours": round(row.allocated_hours, 2),
+                "tasks": row.task_count
+            }
+        return load
+
+    @staticmethod
+    def get_scheduled_hours(assignees, start_date, end_date):
+        """Get total allocated hours per assignee within a date range"""
+        if not assignees:
+            return {}
+
+        rows = frappe.db.sql("""
+            SELECT assignee, SUM(allocated_hours) AS hours
+            FROM `tabPlanner Load`
+            WHERE assignee IN %(assignees)s
+            AND load_date BETWEEN %(start_date)s AND %(end_date)s
+            GROUP BY assignee
+        """, {
+            "assignees": list(assignees),
+            "start_date": getdate(start_date),
+            "end_date": getdate(end_date)
+        }, as_dict=True)
+
+        hours = {assignee: 0 for assignee in assignees}
+        for row in rows:
+            hours[row.assignee] = round(row.hours or 0, 2)
+        return hours
+
+    @staticmethod
+    def rebuild(assignee=None):
+        """Recompute the load table from Atlas Tasks for backfill and repair
+
+        `assignee` may be a user or a list of users; only their rows are
+        rebuilt, from the tasks the assignment index gives them.
+        """
+        assignees = [assignee] if isinstance(assignee, str) else list(assignee or [])
+        if assignees:
+            frappe.db.delete("Planner Load", {"assignee": ["in", assignees]})
+            tasks = frappe.db.sql("""
+                SELECT t.name, t.exp_start_date, t.exp_end_date, t.expected_time, t._assign
+                FROM `tabAtlas Task` t
+                INNER JOIN `tabAtlas Task Assignment` ata ON ata.task = t.name AND ata.position = 0
+                WHERE ata.assignee IN %(assignees)s
+                AND t.exp_start_date IS NOT NULL
+                AND t.exp_end_date IS NOT NULL
+            """, {"assignees": assignees}, as_dict=True)
+        else:
+            frappe.db.sql("DELETE FROM `tabPlanner Load`")
+            tasks = frappe.get_all(
+                "Atlas Task",
+                filters={
+                    "exp_start_date": ["is", "set"],
+                    "exp_end_date": ["is", "set"],
+                    "_assign": ["is", "set"]
+                },
+                fields=["name", "exp_start_date", "exp_end_date", "expected_time", "_assign"]
+            )
+
+        snapshots = [LoadService.get_task_snapshot(task) for task in tasks]
+        snapshots = [s for s in snapshots if s and (not assignees or s[0] in assignees)]
+        calendars = CalendarService.get_employee_calendars([s[0] for s in snapshots])
+
+        delta = {}
+        for snapshot in snapshots:
+            for key, hours in LoadService.get_contribution(snapshot, calendars).items():
+                value = delta.setdefault(key, [0.0, 0])
+                value[0] += hours
+                value[1] += 1
+
+        LoadService.apply_delta(delta)
+        return {"tasks": len(snapshots), "rows": len(delta)}
+
+
+def on_atlas_task_change(doc, method=None):
+    """Keep Planner Load in sync; hooked to Atlas Task on_update/on_trash"""
+    try:
+        if method == "on_trash":
+            old_snapshot, new_snapshot = LoadService.get_task_snapshot(doc), None
+        else:
+            old_snapshot = LoadService.get_task_snapshot(doc.get_doc_before_save())
+            new_snapshot = LoadService.get_task_snapshot(doc)
+        LoadService.apply_task_change(old_snapshot, new_snapshot)
+    except Exception as e:
+        frappe.logger().error(f"Error updating planner load for {doc.name}: {str(e)}")
+
+
+# Task deltas subtract a task's old contribution using today's calendar, so
+# when an assignee's calendar changes their rows are rebuilt instead
+
+def on_employee_change(doc, method=None):
+    """Rebuild load when an employee's calendar may have changed; hooked to Employee events"""
+    try:
+        before = doc.get_doc_before_save()
+        if method != "on_trash" and before and all(
+            before.get(field) == doc.get(field) for field in ("holiday_list", "company", "user_id")
+        ):
+            return
+        enqueue_rebuild({doc.user_id, before.user_id if before else None})
+    except Exception as e:
+        frappe.logger().error(f"Error scheduling planner load rebuild for {doc.name}: {str(e)}")
+
+
+def on_holiday_list_change(doc, method=None):
+    """Rebuild load of every employee on a holiday list; hooked to Holiday List events"""
+    try:
+        users = frappe.db.sql_list("""
+            SELECT DISTINCT e.user_id
+            FROM `tabEmployee` e
+            LEFT JOIN `tabCompany` c ON c.name = e.company
+            WHERE COALESCE(NULLIF(e.holiday_list, ''), c.default_holiday_list) = %(holiday_list)s
+            AND IFNULL(e.user_id, '') != ''
+        """, {"holiday_list": doc.name})
+        enqueue_rebuild(users, doc.name)
+    except Exception as e:
+        frappe.logger().error(f"Error scheduling planner load rebuild for {doc.name}: {str(e)}")
+
+
+def enqueue_rebuild(assignees, holiday_list=None):
+    assignees = sorted(assignee for assignee in assignees if assignee)
+    if assignees:
+        frappe.enqueue(
+            "planner.services.load_service.rebuild_assignees",
+            queue="long",
+            enqueue_after_commit=True,
+            assignees=assignees,
+            holiday_list=holiday_list
+        )
+
+
+def rebuild_assignees(assignees, holiday_list=None):
+    """Rebuild load rows of assignees whose calendar changed; runs as a job"""
+    if holiday_list:
+        # Compile the committed holidays, not a copy cached before the change
+        frappe.cache().hdel(HOLIDAY_CALENDAR_CACHE_KEY, holiday_list)
+    LoadService.rebuild(assignees)
@@ -0,0 +1,152 @@
+import frappe
+from frappe.utils import add_to_date, now_datetime
+from .task_service import TaskService, TASK_FIELD_COLUMNS
+
+# Changes newer than this are resent on the next sync so rows committed by
+# transactions that were still open at read time are not skipped
+SYNC_LAG_SECONDS = 5
+SYNC_LOG_RETENTION_DAYS = 30
+
+
+class SyncService:
+    @staticmethod
+    def get_initial_cursor():
+        """Cursor to hand out with a full load; later syncs start from here"""
+        return TaskService.encode_keyset(add_to_date(now_datetime(), seconds=-SYNC_LAG_SECONDS), "")
+
+    @staticmethod
+    def get_changes(department=None, cursor=None, page_length=None, fields=None):
+        """Get Atlas Tasks created, changed or deleted since a sync cursor
+
+        Changed tasks are read with a keyset scan on (modified, name).
+        Deletions, department moves and changes made without a document
+        save come from the Atlas Task Sync Log. A missing or expired cursor
+        returns reset=True and the client must reload in full.
+        """
+        fields = TaskService.parse_fields(fields, TASK_FIELD_COLUMNS)
+        page_length = TaskService.get_page_length(page_length)
+        now = now_datetime()
+
+        if not cursor:
+            return SyncService._reset_response()
+
+        since, since_name = TaskService.decode_cursor(cursor)
+        if since < add_to_date(now, days=-SYNC_LOG_RETENTION_DAYS):
+            return SyncService._reset_response()
+
+        columns = TaskService.get_field_columns(fields, TASK_FIELD_COLUMNS) + ["modified"]
+        conditions = [
+            "modified >= %(since)s",
+            "(modified > %(since)s OR name > %(since_name)s)",
+            "modified <= %(now)s"
+        ]
+        if department:
+            conditions.append("department = %(department)s")
+
+        values = {"since": since, "since_name": since_name, "now": now, "department": department}
+        tasks = frappe.db.sql(f"""
+            SELECT {", ".join(dict.fromkeys(columns))}
+            FROM `tabAtlas Task`
+            WHERE {" AND ".join(conditions)}
+            ORDER BY modified ASC, name ASC
+            LIMIT %(limit)s
+        """, {**values, "limit": page_length + 1}, as_dict=True)
+
+        has_more = len(tasks) > page_length
+        if has_more:
+            tasks = tasks[:page_length]
+            upper = tasks[-1].modified
+            next_cursor = TaskService.encode_keyset(upper, tasks[-1].name)
+        else:
+            upper = now
+            next_cursor = TaskService.encode_keyset(
+                max(since, add_to_date(now, seconds=-SYNC_LAG_SECONDS)), ""
+            )
+
+        log_filters = [["creation", ">", since], ["creation", "<=", upper]]
+        if department:
+            log_filters.append(["department", "=", department])
+        log_entries = frappe.get_all(
+            "Atlas Task Sync Log",
+            filters=log_filters,
+            fields=["task", "action"],
+            order_by="creation asc"
+        )
+
+        deleted = []
+        touched = []
+        changed_names = {task.name for task in tasks}
+        for entry in log_entries:
+            if entry.action == "Changed":
+                if entry.task not in changed_names:
+                    touched.append(entry.task)
+                    changed_names.add(entry.task)
+            elif entry.task not in deleted:
+                deleted.append(entry.task)
+
+        if touched:
+            task_filters = [["name", "in", touched]]
+            if department:
+                task_filters.append(["department", "=", department])
+            tasks += frappe.get_all("Atlas Task", filters=task_filters, fields=list(dict.fromkeys(columns)))
+
+        # A task that was removed and then came back is a change, not a deletion
+        changed_names = {task.name for task in tasks}
+        deleted = [name for name in deleted if name not in changed_names]
+
+        assignees = {}
+        if not fields or "assignee" in fields:
+            assignees = TaskService.resolve_primary_assignees(tasks)
+
+        return {
+            "changed": [
+                TaskService.format_task(task, assignees.get(task.name, "Unassigned"), fields)
+                for task in tasks
+            ],
+            "deleted": deleted,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "reset": False
+        }
+
+    @staticmethod
+    def _reset_response():
+        return {
+            "changed": [],
+            "deleted": [],
+            "next_cursor": SyncService.get_initial_cursor(),
+            "has_more": False,
+            "reset": True
+        }
+
+
+def log_task_change(task, department, action):
+    """Record a change that is not visible through Atlas Task `modified`"""
+    frappe.get_doc({
+        "doctype": "Atlas Task Sync Log",
+        "task": task,
+        "department": department,
+        "action": action
+    }).db_insert()
+
+
+def on_atlas_task_change(doc, method=None):
+    """Write tombstones; hooked to Atlas Task on_update/on_trash"""
+    try:
+        if method == "on_trash":
+            log_task_change(doc.name, doc.department, "Deleted")
+            return
+
+        before = doc.get_doc_before_save()
+        if before and before.department and before.department != doc.department:
+            log_task_change(doc.name, before.department, "Removed")
+    except Exception as e:
+        frappe.logger().error(f"Error writing sync log for {doc.name}: {str(e)}")
+
+
+def prune_sync_log():
+    """Drop sync log entries older than the retention window; runs daily"""
+    frappe.db.delete(
+        "Atlas Task Sync Log",
+        {"creation": ["<", add_to_date(now_datetime(), days=-SYNC_LOG_RETENTION_DAYS)]}
+    )
@@ -1,54 +1,312 @@
+import base64
+import redis
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, get_datetime, getdate
+from frappe.model.naming import parse_naming_series
+from frappe.utils import now_datetime, get_datetime, getdate, add_days, date_diff, cint, flt
 from ..realtime import emit_task_update, emit_batch_update
+from .assignment_service import AssignmentService
+from .load_service import LoadService
+from .version_service import bump_data_version
+from ..cache import get_cached_tasks, invalidate_task_changes
+
+MAX_TASK_SPAN_CACHE_KEY = "planner_max_task_span"
+MAX_TASK_SPAN_CACHE_EXPIRY = 21600  # 6 hours
+# Stored by writers to make the next reader recompute the span
+MAX_TASK_SPAN_STALE = -1
+
+DEFAULT_PAGE_LENGTH = 500
+MAX_PAGE_LENGTH = 5000
+
+# Response fields of format_task and the Atlas Task columns each one needs
+TASK_FIELD_COLUMNS = {
+    "id": ["name"],
+    "title": ["subject"],
+    "status": ["status"],
+    "priority": ["priority"],
+    "department": ["department"],
+    "project": ["project"],
+    "description": ["description"],
+    "startDate": ["exp_start_date"],
+    "endDate": ["exp_end_date"],
+    "estimatedHours": ["expected_time"],
+    "assignee": ["_assign"],
+    "color": ["color", "status", "priority"],
+    "progress": ["progress"],
+    "modified": ["modified"]
+}
+
+# Atlas Task fields batch_update_tasks may change, and the columns it loads
+BATCH_UPDATE_FIELDS = [
+    "status", "priority", "exp_start_date", "exp_end_date",
+    "expected_time", "description", "progress", "color"
+]
+BATCH_UPDATE_LOAD_COLUMNS = BATCH_UPDATE_FIELDS + [
+    "name", "subject", "department", "project", "_assign", "completed_on", "completed_by"
+]
+BATCH_UPDATE_SIZE = 500
+
+# Fields create_tasks accepts, their defaults, and the links it checks
+CREATE_TASK_SERIES = "TASK-.YYYY.-"
+CREATE_TASK_FIELDS = BATCH_UPDATE_FIELDS + [
+    "subject", "department", "project", "parent_task", "_assign", "is_milestone"
+]
+CREATE_TASK_DEFAULTS = {
+    "subject": None, "status": "Open", "priority": "Medium", "department": None,
+    "project": None, "parent_task": None, "exp_start_date": None, "exp_end_date": None,
+    "expected_time": 0, "progress": 0, "_assign": None, "description": None,
+    "color": None, "is_milestone": 0, "is_group": 0, "completed_on": None, "completed_by": None
+}
+CREATE_TASK_LINKS = {"department": "Department", "project": "Project", "parent_task": "Atlas Task"}
+
+# Atlas Task columns read by move_task: the moved fields plus format_task's
+MOVE_TASK_COLUMNS = [
+    "name", "subject", "status", "priority", "department", "project", "description",
+    "exp_start_date", "exp_end_date", "expected_time", "_assign", "color", "progress", "modified"
+]
+
+# Low-cardinality response fields sent as indexes into a value table by encode_columnar
+COLUMNAR_DICTIONARY_FIELDS = ("status", "priority", "assignee", "project", "department", "color")
+
+
+def on_atlas_task_change(doc, method=None):
+    """Keep the cached maximum task span an upper bound; hooked to Atlas Task on_update"""
+    try:
+        TaskService.note_task_span(doc.department, doc.exp_start_date, doc.exp_end_date)
+    except Exception as e:
+        frappe.logger().error(f"Error updating task span for {doc.name}: {str(e)}")
+
 
 class TaskService:
     @staticmethod
-    def get_all_tasks(department=None, start_date=None, end_date=None):
-        """Get all Atlas Tasks with optional department and date filters"""
+    def get_all_tasks(department=None, start_date=None, end_date=None, assignee=None, overlap=False, fields=None):
+        """Get all Atlas Tasks with optional department, date and assignee filters
+
+        By default the date filters select tasks contained in the window.
+        With overlap=True they select every task that intersects it.
+        `fields` limits both the selected columns and the response keys.
+        Results are served through the planner read-through cache.
+        """
+        fields = TaskService.parse_fields(fields, TASK_FIELD_COLUMNS)
+
         try:
-            filters = {}
+            return get_cached_tasks(department, start_date, end_date, fields, assignee, overlap)
+        except Exception as e:
+            frappe.logger().error(f"Error getting tasks: {str(e)}")
+            return []
+
+    @staticmethod
+    def fetch_all_tasks(department=None, start_date=None, end_date=None, assignee=None, overlap=False, fields=None):
+        """Query and format tasks for get_all_tasks, bypassing the cache"""
+        columns = TaskService.get_field_columns(fields, TASK_FIELD_COLUMNS)
+
+        filters = []
+        
+        if department:
+            filters.append(["department", "=", department])
+
+        if assignee:
+            task_names = AssignmentService.get_task_names(assignee)
+            if not task_names:
+                return []
+            filters.append(["name", "in", task_names])
             
-            if department:
-                filters["department"] = department
-                
+        if overlap and start_date and end_date:
+            filters.extend(TaskService.get_overlap_filters(department, start_date, end_date))
+        else:
             if start_date:
-                filters["exp_start_date"] = [">=", start_date]
+                filters.append(["exp_start_date", ">=", start_date])
             if end_date:
-                filters["exp_end_date"] = ["<=", end_date]
-                
-            print(f"\n=== Getting Atlas Tasks ===")
-            print(f"Filters: {filters}")
-            
-            tasks = frappe.get_all(
-                "Atlas Task",
-                filters=filters,
-                fields=[
-                    "name", "subject", "status", "priority",
-                    "exp_start_date", "exp_end_date", "expected_time",
-                    "department", "_assign", "project", "description",
-                    "color", "progress"
-                ],
-                order_by="creation desc"
-            )
-            
-            print(f"Found {len(tasks)} tasks")
-            if not tasks:
-                print("Checking if Atlas Task doctype exists...")
-                if not frappe.db.exists("DocType", "Atlas Task"):
-                    print("ERROR: Atlas Task DocType does not exist!")
-                else:
-                    print("Atlas Task DocType exists but no tasks found")
-                    
-            formatted_tasks = [TaskService.format_task(task) for task in tasks]
-            print(f"Formatted {len(formatted_tasks)} tasks successfully")
+                filters.append(["exp_end_date", "<=", end_date])
             
-            return formatted_tasks
-            
-        except Exception as e:
-            frappe.logger().error(f"Error getting tasks: {str(e)}")
-            return []
+        print(f"\n=== Getting Atlas Tasks ===")
+        print(f"Filters: {filters}")
+        
+        tasks = frappe.get_all(
+            "Atlas Task",
+            filters=filters,
+            fields=columns,
+            order_by="creation desc"
+        )
+        
+        print(f"Found {len(tasks)} tasks")
+        if not tasks:
+            print("Checking if Atlas Task doctype exists...")
+            if not frappe.db.exists("DocType", "Atlas Task"):
+                print("ERROR: Atlas Task DocType does not exist!")
+            else:
+                print("Atlas Task DocType exists but no tasks found")
+                
+        assignees = {}
+        if not fields or "assignee" in fields:
+            assignees = TaskService.resolve_primary_assignees(tasks)
+        formatted_tasks = [
+            TaskService.format_task(task, assignees.get(task.name, "Unassigned"), fields)
+            for task in tasks
+        ]
+        print(f"Formatted {len(formatted_tasks)} tasks successfully")
+        
+        return formatted_tasks
+
+    @staticmethod
+    def get_overlap_filters(department, start_date, end_date):
+        """Filters selecting tasks that intersect [start_date, end_date]
+
+        The interval predicate alone (start <= window_end AND end >=
+        window_start) leaves the start date unbounded below. Capping the
+        start at window_start minus the longest known task span turns it
+        into a bounded range scan on the (department, exp_start_date,
+        exp_end_date) index without dropping long-running tasks.
+        """
+        start_date = getdate(start_date)
+        end_date = getdate(end_date)
+        filters = [
+            ["exp_start_date", "<=", end_date],
+            ["exp_end_date", ">=", start_date]
+        ]
+
+        max_span = TaskService.get_max_task_span(department)
+        if max_span is not None:
+            filters.append(["exp_start_date", ">=", add_days(start_date, -max_span)])
+
+        return filters
+
+    @staticmethod
+    def get_max_task_span(department=None):
+        """Longest exp_end_date - exp_start_date in days, cached per department
+
+        The computed value is stored in a transaction watching its key, so
+        it is dropped if note_task_span marked the key stale meanwhile: a
+        value read before a longer task committed is never cached.
+        """
+        cache = frappe.cache()
+        key = cache.make_key(f"{MAX_TASK_SPAN_CACHE_KEY}:{department or 'all'}")
+
+        with cache.pipeline() as pipeline:
+            pipeline.watch(key)
+            cached = cint(pipeline.get(key), MAX_TASK_SPAN_STALE)
+            if cached != MAX_TASK_SPAN_STALE:
+                return cached
+
+            query = """
+                SELECT MAX(DATEDIFF(exp_end_date, exp_start_date))
+                FROM `tabAtlas Task`
+                WHERE exp_start_date IS NOT NULL
+                AND exp_end_date IS NOT NULL
+            """
+            if department:
+                query += " AND department = %(department)s"
+
+            max_span = frappe.db.sql(query, {"department": department})[0][0]
+            if max_span is None:
+                return None
+
+            try:
+                pipeline.multi()
+                pipeline.set(key, int(max_span), ex=MAX_TASK_SPAN_CACHE_EXPIRY)
+                pipeline.execute()
+            except redis.exceptions.WatchError:
+                pass
+
+        return int(max_span)
+
+    @staticmethod
+    def note_task_span(department, start_date, end_date):
+        """Mark the cached maximum task span stale after commit if a task may exceed it"""
+        if not start_date or not end_date:
+            return
+
+        span = date_diff(end_date, start_date)
+        frappe.db.after_commit.add(lambda: TaskService.expire_task_span(department, span))
+
+    @staticmethod
+    def expire_task_span(department, span):
+        # Also written when nothing is cached, so a reader computing the
+        # span right now sees its watched key change and does not store it
+        cache = frappe.cache()
+        for cache_field in {department or "all", "all"}:
+            key = cache.make_key(f"{MAX_TASK_SPAN_CACHE_KEY}:{cache_field}")
+            cached = cint(redis.Redis.get(cache, key), MAX_TASK_SPAN_STALE)
+            if cached == MAX_TASK_SPAN_STALE or span > cached:
+                cache.set(key, MAX_TASK_SPAN_STALE, ex=MAX_TASK_SPAN_CACHE_EXPIRY)
+
+    @staticmethod
+    def parse_fields(fields, allowed):
+        """Validate a requested field list against an allow-list
+
+        Accepts a list, a JSON list or a comma separated string and returns
+        the list of fields, or None when every field is wanted.
+        """
+        if not fields:
+            return None
+
+        if isinstance(fields, str):
+            fields = frappe.parse_json(fields) if fields.lstrip().startswith("[") else fields.split(",")
+
+        fields = list(dict.fromkeys(f.strip() for f in fields if f and f.strip()))
+        invalid = [f for f in fields if f not in allowed]
+        if invalid:
+            frappe.throw(_("Invalid fields: {0}").format(", ".join(invalid)), frappe.ValidationError)
+
+        return fields or None
+
+    @staticmethod
+    def get_field_columns(fields, field_columns):
+        """Database columns needed to build the requested response fields"""
+        if not fields:
+            fields = list(field_columns)
+
+        columns = ["name"]
+        for field in fields:
+            for column in field_columns[field]:
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    @staticmethod
+    def get_page_length(page_length=None):
+        """Clamp a requested page length to the allowed range"""
+        page_length = cint(page_length) or DEFAULT_PAGE_LENGTH
+        return max(1, min(page_length, MAX_PAGE_LENGTH))
+
+    @staticmethod
+    def encode_cursor(task):
+        """Opaque keyset cursor for the (creation, name) of the last row on a page"""
+        return TaskService.encode_keyset(task.creation, task.name)
+
+    @staticmethod
+    def encode_keyset(timestamp, name):
+        """Opaque cursor for a (timestamp, name) keyset position"""
+        payload = frappe.as_json([str(timestamp), name], indent=None)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decode a keyset cursor into (timestamp, name)"""
+        try:
+            creation, name = frappe.parse_json(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return get_datetime(creation), name
+        except Exception:
+            frappe.throw(_("Invalid cursor"), frappe.ValidationError)
+
+    @staticmethod
+    def keyset_condition(cursor, alias="`tabAtlas Task`"):
+        """SQL condition and values selecting rows after a cursor in creation desc, name desc order"""
+        if not cursor:
+            return None, {}
+
+        creation, name = TaskService.decode_cursor(cursor)
+        condition = f"""{alias}.creation <= %(cursor_creation)s
+            AND ({alias}.creation < %(cursor_creation)s OR {alias}.name < %(cursor_name)s)"""
+        return condition, {"cursor_creation": creation, "cursor_name": name}
+
+    @staticmethod
+    def split_page(rows, page_length):
+        """Split a page_length + 1 fetch into (rows, next_cursor)"""
+        if len(rows) > page_length:
+            rows = rows[:page_length]
+            return rows, TaskService.encode_cursor(rows[-1])
+        return rows, None
 
     @staticmethod
     def get_task(task_id):
@@ -82,13 +340,9 @@ class TaskService:
                 setattr(task, field, value)
             
             task.modified = now_datetime()
+            # Realtime updates are queued by the Atlas Task on_update hook
             task.save()
             
-            try:
-                emit_task_update(task)
-            except:
-                pass
-            
             return TaskService.format_task(task)
             
         except Exception as e:
@@ -97,90 +351,399 @@ class TaskService:
 
     @staticmethod
     def batch_update_tasks(updates):
-        """Update multiple Atlas Tasks in batch"""
-        try:
-            if not updates:
-                frappe.throw(_("No updates provided"))
-            
-            updated_tasks = []
-            for update in updates:
-                task_id = update.get('task_id')
-                changes = update.get('changes', {})
-                
-                if task_id and changes:
-                    try:
-                        updated_task = TaskService.update_task(task_id, changes)
-                        if updated_task:
-                            updated_tasks.append(updated_task)
-                    except Exception as task_error:
-                        frappe.logger().error(f"Error updating task {task_id}: {str(task_error)}")
-                        continue
-            
-            if updated_tasks:
-                try:
-                    emit_batch_update(updated_tasks)
-                except:
-                    pass
-            
-            return updated_tasks
-            
-        except Exception as e:
-            frappe.logger().error(f"Error in batch update: {str(e)}")
-            raise
+        """Update many Atlas Tasks in one transaction
+
+        `updates` is a list of {"task_id", "changes"}. Every item is
+        validated up front against rows loaded in one query; valid items
+        are written with one grouped UPDATE per batch and published as a
+        single batch event. Returns one {"task_id", "success", "task" or
+        "error"} result per item, in order.
+
+        Writes bypass document events (and so Version history); the
+        Planner Load table, task span cache and data version are updated
+        here instead.
+        """
+        if not updates:
+            frappe.throw(_("No updates provided"))
+
+        frappe.has_permission("Atlas Task", "write", throw=True)
+
+        task_ids = list({update.get("task_id") for update in updates if update.get("task_id")})
+        rows = {
+            row.name: row for row in frappe.get_list(
+                "Atlas Task",
+                filters={"name": ["in", task_ids]},
+                fields=list(dict.fromkeys(BATCH_UPDATE_LOAD_COLUMNS + TaskService.get_permission_columns()))
+            )
+        } if task_ids else {}
+
+        results = []
+        changed = {}
+        writable = {}
+        for update in updates:
+            task_id = update.get("task_id")
+            try:
+                if not task_id:
+                    frappe.throw(_("Task ID is required"))
+                if task_id not in rows:
+                    frappe.throw(_("Atlas Task {0} not found").format(task_id), frappe.DoesNotExistError)
+                # Checked per document: the grouped UPDATE skips doc.save()'s checks
+                if task_id not in writable:
+                    writable[task_id] = TaskService.can_write(rows[task_id])
+                if not writable[task_id]:
+                    frappe.throw(_("Not permitted to update Atlas Task {0}").format(task_id), frappe.PermissionError)
+
+                # Later items for the same task build on earlier ones
+                base = changed[task_id][1] if task_id in changed else rows[task_id]
+                changed[task_id] = (rows[task_id], TaskService.apply_changes(base, update.get("changes")))
+                results.append({"task_id": task_id, "success": True})
+            except Exception as e:
+                frappe.clear_messages()
+                results.append({"task_id": task_id, "success": False, "error": str(e)})
+
+        if not changed:
+            return results
+
+        now = now_datetime()
+        new_rows = [new for old, new in changed.values()]
+        for row in new_rows:
+            row.modified = now
+            row.modified_by = frappe.session.user
+        TaskService.write_rows(new_rows, BATCH_UPDATE_FIELDS + ["completed_on", "completed_by", "modified", "modified_by"])
+
+        LoadService.apply_task_changes([
+            (LoadService.get_task_snapshot(old), LoadService.get_task_snapshot(new))
+            for old, new in changed.values()
+        ])
+        for row in new_rows:
+            TaskService.note_task_span(row.department, row.exp_start_date, row.exp_end_date)
+        bump_data_version()
+        invalidate_task_changes(list(changed.values()))
+
+        formatted = {}
+        assignees = TaskService.resolve_primary_assignees(new_rows)
+        for row in new_rows:
+            formatted[row.name] = TaskService.format_task(row, assignees.get(row.name, "Unassigned"))
+        for result in results:
+            if result["success"]:
+                result["task"] = formatted[result["task_id"]]
+
+        emit_batch_update(new_rows)
+
+        return results
 
     @staticmethod
-    def move_task(task_id, assignee_id=None, start_date=None, end_date=None):
-        """Move Atlas Task to different assignee or schedule"""
-        try:
-            if not task_id:
-                frappe.throw(_("Task ID is required"))
-            
-            task = frappe.get_doc("Atlas Task", task_id)
-            
-            if assignee_id:
-                if assignee_id == "unassigned":
-                    task._assign = None
-                else:
-                    employee = frappe.get_value("Employee", {"user_id": assignee_id}, "name")
-                    if employee:
-                        task._assign = frappe.as_json([assignee_id])
-                    else:
-                        frappe.throw(_("Invalid assignee"))
-            
-            if start_date:
-                task.exp_start_date = getdate(start_date)
-            if end_date:
-                task.exp_end_date = getdate(end_date)
-            
-            task.save(ignore_version=True)
-            frappe.db.commit()
-            
+    def get_permission_columns():
+        """Atlas Task columns document-level permission checks read: owner and links"""
+        return ["owner"] + [df.fieldname for df in frappe.get_meta("Atlas Task").get_link_fields()]
+
+    @staticmethod
+    def can_write(row):
+        """Check write permission on an Atlas Task row loaded with get_permission_columns()"""
+        doc = frappe.get_doc({"doctype": "Atlas Task", **row})
+        return frappe.has_permission("Atlas Task", "write", doc=doc)
+
+    @staticmethod
+    def apply_changes(row, changes, allowed=BATCH_UPDATE_FIELDS):
+        """Return a copy of a task row with validated changes applied
+
+        Mirrors AtlasTask.validate for dates, progress and completion.
+        """
+        if not changes or not isinstance(changes, dict):
+            frappe.throw(_("No changes provided"))
+
+        invalid = [field for field in changes if field not in allowed]
+        if invalid:
+            frappe.throw(_("Invalid fields: {0}").format(", ".join(invalid)))
+
+        meta = frappe.get_meta("Atlas Task")
+        row = frappe._dict(row)
+        for field, value in changes.items():
+            if field in ("status", "priority"):
+                options = (meta.get_field(field).options or "").split("\n")
+                if value not in options:
+                    frappe.throw(_("Invalid {0}: {1}").format(field, value))
+            elif field in ("exp_start_date", "exp_end_date"):
+                value = getdate(value) if value else None
+            elif field in ("expected_time", "progress"):
+                value = flt(value)
+                if value < 0:
+                    frappe.throw(_("{0} cannot be negative").format(field))
+            elif field == "is_milestone":
+                value = cint(value)
+            elif field == "_assign" and isinstance(value, list):
+                value = frappe.as_json(value, indent=None) if value else None
+            row[field] = value
+
+        if row.exp_start_date and row.exp_end_date and getdate(row.exp_start_date) > getdate(row.exp_end_date):
+            frappe.throw(_("Expected Start Date cannot be greater than Expected End Date"))
+
+        if row.progress is not None:
+            if flt(row.progress) > 100:
+                frappe.throw(_("Progress % cannot be more than 100"))
+            if flt(row.progress) == 100:
+                row.status = "Completed"
+
+        if row.status == "Completed":
+            row.completed_on = row.completed_on or now_datetime()
+            row.completed_by = row.completed_by or frappe.session.user
+
+        return row
+
+    @staticmethod
+    def create_tasks(tasks):
+        """Insert many Atlas Tasks in batches
+
+        Every row is validated first (see apply_changes); a block of
+        TASK-.YYYY.- series numbers is then reserved for the valid rows
+        with a single counter update and they are inserted with
+        bulk_insert. Returns one {"index", "success", "name" or "error"}
+        result per input row, in order.
+
+        Inserts bypass document events; the assignment index, Planner
+        Load, task span cache and data version are updated here instead.
+        """
+        if not tasks:
+            frappe.throw(_("No tasks provided"))
+
+        frappe.has_permission("Atlas Task", "create", throw=True)
+
+        results = []
+        valid = []
+        for index, data in enumerate(tasks):
             try:
-                emit_task_update(task)
-            except:
-                pass
-            
-            return {
-                "success": True,
-                "task": TaskService.format_task(task),
-                "message": "Task moved successfully"
-            }
-            
-        except Exception as e:
-            frappe.logger().error(f"Error moving task {task_id}: {str(e)}")
-            raise
+                if not isinstance(data, dict) or not (data.get("subject") or "").strip():
+                    frappe.throw(_("Subject is required"))
+                row = TaskService.apply_changes(CREATE_TASK_DEFAULTS, data, CREATE_TASK_FIELDS)
+                valid.append((index, row))
+                results.append({"index": index, "success": True})
+            except Exception as e:
+                frappe.clear_messages()
+                results.append({"index": index, "success": False, "error": str(e)})
+
+        TaskService.validate_links(valid, results)
+        valid = [(index, row) for index, row in valid if results[index]["success"]]
+        if not valid:
+            return results
+
+        names = TaskService.reserve_series(CREATE_TASK_SERIES, len(valid))
+        now = now_datetime()
+        user = frappe.session.user
+        rows = []
+        for (index, row), name in zip(valid, names):
+            row.update({
+                "name": name, "naming_series": CREATE_TASK_SERIES, "docstatus": 0, "idx": 0,
+                "creation": now, "modified": now, "owner": user, "modified_by": user
+            })
+            rows.append(row)
+            results[index]["name"] = name
+
+        columns = list(rows[0])
+        for i in range(0, len(rows), BATCH_UPDATE_SIZE):
+            frappe.db.bulk_insert(
+                "Atlas Task", columns,
+                [[row.get(column) for column in columns] for row in rows[i:i + BATCH_UPDATE_SIZE]]
+            )
+
+        AssignmentService.sync_tasks([row for row in rows if row._assign])
+        LoadService.apply_task_changes([(None, LoadService.get_task_snapshot(row)) for row in rows])
+        for row in rows:
+            TaskService.note_task_span(row.department, row.exp_start_date, row.exp_end_date)
+        bump_data_version()
+        invalidate_task_changes([(None, row) for row in rows])
+        emit_batch_update(rows)
+
+        return results
 
     @staticmethod
-    def format_task(task):
-        """Format Atlas Task for API response"""
-        try:
-            assignee = "Unassigned"
+    def validate_links(rows, results):
+        """Fail (index, row) pairs whose department, project or parent task does not exist"""
+        missing = {}
+        for field, doctype in CREATE_TASK_LINKS.items():
+            values = list({row[field] for index, row in rows if row.get(field)})
+            if values:
+                existing = set(frappe.get_all(doctype, filters={"name": ["in", values]}, pluck="name"))
+                missing[field] = set(values) - existing
+
+        for index, row in rows:
+            for field, doctype in CREATE_TASK_LINKS.items():
+                if row.get(field) in missing.get(field, ()):
+                    results[index].update({
+                        "success": False,
+                        "error": _("{0} {1} not found").format(_(doctype), row[field])
+                    })
+                    break
+
+    @staticmethod
+    def reserve_series(naming_series, count):
+        """Reserve `count` consecutive names of a naming series in one update
+
+        Same format as Frappe's naming series (five digit counter appended
+        to the parsed prefix); the Series row stays locked until commit.
+        """
+        prefix = parse_naming_series(naming_series)
+        frappe.db.sql("""
+            INSERT INTO `tabSeries` (name, current) VALUES (%s, 0)
+            ON DUPLICATE KEY UPDATE name = name
+        """, (prefix,))
+        current = cint(frappe.db.sql(
+            "SELECT current FROM `tabSeries` WHERE name = %s FOR UPDATE", (prefix,)
+        )[0][0])
+        frappe.db.sql("UPDATE `tabSeries` SET current = %s WHERE name = %s", (current + count, prefix))
+
+        return [f"{prefix}{number:05d}" for number in range(current + 1, current + count + 1)]
+
+    @staticmethod
+    def write_rows(rows, columns):
+        """Write columns of many task rows with one CASE-grouped UPDATE per batch"""
+        for i in range(0, len(rows), BATCH_UPDATE_SIZE):
+            batch = rows[i:i + BATCH_UPDATE_SIZE]
+            assignments = []
+            values = []
+            for column in columns:
+                cases = " ".join(["WHEN %s THEN %s"] * len(batch))
+                assignments.append(f"`{column}` = CASE name {cases} ELSE `{column}` END")
+                values.extend(value for row in batch for value in (row.name, row.get(column)))
+
+            frappe.db.sql(f"""
+                UPDATE `tabAtlas Task`
+                SET {", ".join(assignments)}
+                WHERE name IN %s
+            """, values + [[row.name for row in batch]])
+
+    @staticmethod
+    def move_task(task_id, assignee_id=None, start_date=None, end_date=None, modified=None):
+        """Move an Atlas Task to another assignee and/or dates
+
+        Only `_assign`, exp_start_date and exp_end_date are validated and
+        written, with an UPDATE conditional on `modified` (the value the
+        client last saw, or the one just read). If the task changed in the
+        meantime nothing is written and a conflict response carrying the
+        current task is returned.
+        """
+        if not task_id:
+            frappe.throw(_("Task ID is required"))
+
+        task = frappe.db.get_value("Atlas Task", task_id, MOVE_TASK_COLUMNS, as_dict=True)
+        if not task:
+            frappe.throw(_("Atlas Task {0} not found").format(task_id), frappe.DoesNotExistError)
+
+        # Checked against the document: the UPDATE below skips doc.save()'s checks
+        frappe.has_permission("Atlas Task", "write", doc=task_id, throw=True)
+
+        expected = get_datetime(modified) if modified else task.modified
+        if get_datetime(task.modified) != expected:
+            return TaskService.move_conflict(task)
+
+        moved = frappe._dict(task)
+        if assignee_id:
+            if assignee_id == "unassigned":
+                moved._assign = None
+            elif frappe.db.exists("Employee", {"user_id": assignee_id}):
+                moved._assign = frappe.as_json([assignee_id], indent=None)
+            else:
+                frappe.throw(_("Invalid assignee"))
+
+        if start_date:
+            moved.exp_start_date = getdate(start_date)
+        if end_date:
+            moved.exp_end_date = getdate(end_date)
+        if moved.exp_start_date and moved.exp_end_date and getdate(moved.exp_start_date) > getdate(moved.exp_end_date):
+            frappe.throw(_("Expected Start Date cannot be greater than Expected End Date"))
+
+        moved.modified = now_datetime()
+        frappe.db.sql("""
+            UPDATE `tabAtlas Task`
+            SET _assign = %(assign)s,
+                exp_start_date = %(start_date)s,
+                exp_end_date = %(end_date)s,
+                modified = %(now)s,
+                modified_by = %(user)s
+            WHERE name = %(name)s
+            AND modified = %(expected)s
+        """, {
+            "assign": moved._assign,
+            "start_date": moved.exp_start_date,
+            "end_date": moved.exp_end_date,
+            "now": moved.modified,
+            "user": frappe.session.user,
+            "name": task_id,
+            "expected": expected
+        })
+        if not frappe.db.sql("SELECT ROW_COUNT()")[0][0]:
+            return TaskService.move_conflict(
+                frappe.db.get_value("Atlas Task", task_id, MOVE_TASK_COLUMNS, as_dict=True)
+            )
+
+        # Document events are skipped, so derived data is kept in sync here
+        if moved._assign != task._assign:
+            AssignmentService.sync_tasks([moved])
+        LoadService.apply_task_change(
+            LoadService.get_task_snapshot(task),
+            LoadService.get_task_snapshot(moved)
+        )
+        TaskService.note_task_span(moved.department, moved.exp_start_date, moved.exp_end_date)
+        bump_data_version()
+        invalidate_task_changes([(task, moved)])
+
+        emit_task_update(moved)
+
+        return {
+            "success": True,
+            "task": TaskService.format_task(moved),
+            "message": "Task moved successfully"
+        }
+
+    @staticmethod
+    def move_conflict(task):
+        """Response for a move that lost the race against another change"""
+        return {
+            "success": False,
+            "conflict": True,
+            "task": TaskService.format_task(task) if task else None,
+            "message": _("Task was changed by someone else; reload and try again")
+        }
+
+    @staticmethod
+    def resolve_primary_assignees(tasks):
+        """Map task name to its primary assignee for a whole result set
+
+        Parses `_assign` of every task and validates all distinct users with
+        a single query. Tasks without a valid assignee map to "Unassigned".
+        """
+        first_assignees = {}
+        for task in tasks:
+            assignee = None
             if task._assign:
-                assigned_users = frappe.parse_json(task._assign)
-                if assigned_users and len(assigned_users) > 0:
-                    assignee = assigned_users[0]
+                try:
+                    assigned_users = frappe.parse_json(task._assign)
+                    if assigned_users:
+                        assignee = assigned_users[0]
+                except Exception:
+                    frappe.logger().error(f"Invalid _assign value on task {task.name}")
+            first_assignees[task.name] = assignee
+
+        users = list({assignee for assignee in first_assignees.values() if assignee})
+        valid_users = set()
+        if users:
+            valid_users = set(frappe.get_all("User", filters={"name": ["in", users]}, pluck="name"))
+            invalid_users = set(users) - valid_users
+            if invalid_users:
+                frappe.logger().warning(f"Ignoring invalid assignees: {', '.join(sorted(invalid_users))}")
+
+        return {
+            name: assignee if assignee in valid_users else "Unassigned"
+            for name, assignee in first_assignees.items()
+        }
+
+    @staticmethod
+    def format_task(task, assignee=None, fields=None):
+        """Format Atlas Task for API response, optionally limited to `fields`"""
+        try:
+            if assignee is None:
+                assignee = TaskService.resolve_primary_assignees([task])[task.name]
             
-            return {
+            formatted = {
                 "id": task.name,
                 "title": task.subject,
                 "status": task.status,
@@ -193,13 +756,46 @@ class TaskService:
                 "estimatedHours": task.expected_time,
                 "assignee": assignee,
                 "color": task.color or TaskService.get_task_color(task),
-                "progress": task.progress or 0
+                "progress": task.progress or 0,
+                "modified": task.modified
             }
+
+            if fields:
+                return {field: formatted[field] for field in fields}
+            return formatted
             
         except Exception as e:
             frappe.logger().error(f"Error formatting task {task.name}: {str(e)}")
             return None
 
+    @staticmethod
+    def encode_columnar(rows, dictionary_fields=COLUMNAR_DICTIONARY_FIELDS):
+        """Encode a list of dicts as one array per key
+
+        Keys in `dictionary_fields` are sent as indexes into a table of their
+        distinct values, so repeated strings are serialized once. Decoded by
+        decodeColumnar in the frontend composables.
+        """
+        rows = [row for row in rows if row]
+        columns = {}
+        dictionaries = {}
+
+        for key in (rows[0] if rows else ()):
+            values = [row[key] for row in rows]
+            if key in dictionary_fields:
+                index = {}
+                columns[key] = [index.setdefault(value, len(index)) for value in values]
+                dictionaries[key] = list(index)
+            else:
+                columns[key] = values
+
+        return {
+            "format": "columnar",
+            "length": len(rows),
+            "columns": columns,
+            "dictionaries": dictionaries
+        }
+
     @staticmethod
     def get_task_color(task):
         """Get color based on Atlas Task status and priority"""
@@ -0,0 +1,91 @@
+import hashlib
+import frappe
+from frappe.utils import getdate
+
+DATA_VERSION_CACHE_KEY = "planner_data_version"
+
+
+def bump_data_version(doc=None, method=None):
+    """Invalidate planner version tokens once the current transaction commits
+
+    Hooked to every doctype that feeds workload or backlog responses.
+    Bumping after commit keeps a concurrent request from pairing the new
+    token with data read before the change became visible.
+    """
+    frappe.db.after_commit.add(VersionService.reset_data_version)
+
+
+class VersionService:
+    """Cheap version tokens used as ETags for planner read endpoints
+
+    A token combines COUNT(*) and MAX(modified) of the Atlas Tasks in scope
+    (an index-only read) with a hooks-maintained random version that moves
+    whenever assignments, employees, holidays or leaves change.
+    """
+
+    @staticmethod
+    def get_data_version():
+        """Current data version; a fresh one is made if Redis lost it"""
+        version = frappe.cache().get_value(DATA_VERSION_CACHE_KEY)
+        if not version:
+            version = VersionService.reset_data_version()
+        return version
+
+    @staticmethod
+    def reset_data_version():
+        # Random rather than incremented so a flushed cache can never
+        # hand out a token that matches one issued before the flush
+        version = frappe.generate_hash(length=12)
+        frappe.cache().set_value(DATA_VERSION_CACHE_KEY, version)
+        return version
+
+    @staticmethod
+    def get_task_stamp(department=None):
+        """(count, max modified) of Atlas Tasks, optionally for one department"""
+        condition = "WHERE department = %(department)s" if department else ""
+        row = frappe.db.sql(f"""
+            SELECT COUNT(*), MAX(modified)
+            FROM `tabAtlas Task`
+            {condition}
+        """, {"department": department})
+        return row[0] if row else (0, None)
+
+    @staticmethod
+    def make_etag(*parts):
+        """Quoted strong ETag from the given parts"""
+        digest = hashlib.sha1(frappe.as_json(parts, indent=None).encode()).hexdigest()
+        return f'"{digest[:20]}"'
+
+    @staticmethod
+    def get_workload_etag(department=None, start_date=None, end_date=None, fields=None, format=None):
+        """ETag of a get_workload_data response"""
+        return VersionService.make_etag(
+            "workload", department, start_date, end_date, fields, format,
+            # Missing dates default to today, so the token must roll over daily
+            str(getdate()),
+            VersionService.get_data_version(),
+            *map(str, VersionService.get_task_stamp(department))
+        )
+
+    @staticmethod
+    def get_backlog_etag(*params):
+        """ETag of a planner_get_backlog page for the given request parameters"""
+        return VersionService.make_etag(
+            "backlog", *params,
+            VersionService.get_data_version(),
+            *map(str, VersionService.get_task_stamp())
+        )
+
+    @staticmethod
+    def is_not_modified(etag):
+        """Check whether the request's If-None-Match already names this ETag"""
+        request = getattr(frappe.local, "request", None)
+        if not request:
+            return False
+
+        if_none_match = request.headers.get("If-None-Match")
+        if not if_none_match:
+            return False
+
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
@@ -1,65 +1,93 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, add_days, date_diff
-from .task_service import TaskService
+from .task_service import TaskService, TASK_FIELD_COLUMNS
+from .calendar_service import CalendarService, is_hrms_installed
+from .load_service import LoadService
+from .sync_service import SyncService
+from ..cache import get_cached_workload
+
+DIRECTORY_CACHE_KEY = "planner_employee_directory"
+# Bounds how long a snapshot read while a change was uncommitted can survive
+DIRECTORY_CACHE_EXPIRY = 21600  # 6 hours
+
+
+def clear_employee_directory(doc, method=None):
+    """Drop directory snapshots affected by an Employee or User change once it commits"""
+    try:
+        if doc.doctype == "Employee":
+            departments = {doc.department}
+            before = doc.get_doc_before_save()
+            if before:
+                departments.add(before.department)
+        else:
+            departments = set(frappe.get_all("Employee", filters={"user_id": doc.name}, pluck="department"))
+            if not departments:
+                return
+
+        departments.add("all")
+        fields = [department for department in departments if department]
+        frappe.db.after_commit.add(lambda: frappe.cache().hdel(DIRECTORY_CACHE_KEY, fields))
+    except Exception as e:
+        frappe.logger().error(f"Error clearing employee directory: {str(e)}")
 
 class WorkloadService:
     @staticmethod
     def get_department_employees(department=None):
-        """Get all employees in a department with their details"""
+        """Get all employees in a department with their details
+
+        Served from a per-department directory snapshot that is dropped
+        whenever an Employee or linked User changes.
+        """
         try:
-            # Get only active employees with specific fields
-            query = """
-                SELECT 
-                    name, employee_name, user_id, image,
-                    department, designation, company
-                FROM `tabEmployee`
-                WHERE status = 'Active'
-                AND user_id IS NOT NULL
-            """
-            
-            if department:
-                query += " AND department = %(department)s"
-            
-            employees = frappe.db.sql(query, {"department": department}, as_dict=True)
-            
-            if not employees:
+            cache_field = department or "all"
+            employee_list = frappe.cache().hget(DIRECTORY_CACHE_KEY, cache_field)
+
+            if employee_list is None:
+                employee_list = WorkloadService._get_employee_directory(department)
+                cache = frappe.cache()
+                cache.hset(DIRECTORY_CACHE_KEY, cache_field, employee_list)
+                cache.expire(cache.make_key(DIRECTORY_CACHE_KEY), DIRECTORY_CACHE_EXPIRY)
+
+            if not employee_list:
                 frappe.logger().warning(f"No active employees found for department: {department}")
-                return []
-            
-            employee_list = []
-            for emp in employees:
-                try:
-                    user_info = {}
-                    if emp.user_id:
-                        user_info = frappe.get_cached_value(
-                            "User", 
-                            emp.user_id, 
-                            ["full_name", "user_image", "email"], 
-                            as_dict=True
-                        ) or {}
-                    
-                    employee_data = {
-                        "id": emp.user_id or emp.name,
-                        "employee_id": emp.name,
-                        "name": user_info.get("full_name") or emp.employee_name or "Unknown",
-                        "email": user_info.get("email") or emp.user_id or "",
-                        "image": user_info.get("user_image") or emp.image,
-                        "role": emp.designation or "Employee",
-                        "department": emp.department_name or department or "Unknown",
-                        "company": emp.company
-                    }
-                    employee_list.append(employee_data)
-                except Exception as emp_error:
-                    frappe.logger().error(f"Error processing employee {emp.name}: {str(emp_error)}")
-                    continue
-            
-            return employee_list
+
+            return [dict(employee) for employee in employee_list]
             
         except Exception as e:
             frappe.logger().error(f"Error in get_department_employees: {str(e)}")
             return []
 
+    @staticmethod
+    def _get_employee_directory(department=None):
+        """Load active employees joined with their User records in one query"""
+        query = """
+            SELECT 
+                e.name, e.employee_name, e.user_id, e.image,
+                e.department, e.designation, e.company,
+                u.full_name, u.user_image, u.email
+            FROM `tabEmployee` e
+            LEFT JOIN `tabUser` u ON u.name = e.user_id
+            WHERE e.status = 'Active'
+            AND e.user_id IS NOT NULL
+        """
+        
+        if department:
+            query += " AND e.department = %(department)s"
+        
+        employees = frappe.db.sql(query, {"department": department}, as_dict=True)
+        
+        return [{
+            "id": emp.user_id or emp.name,
+            "employee_id": emp.name,
+            "name": emp.full_name or emp.employee_name or "Unknown",
+            "email": emp.email or emp.user_id or "",
+            "image": emp.user_image or emp.image,
+            "role": emp.designation or "Employee",
+            "department": emp.department or department or "Unknown",
+            "company": emp.company
+        } for emp in employees]
+
     @staticmethod
     def _get_unassigned_employee(department=None):
         """Helper method to create unassigned employee entry"""
@@ -81,81 +109,26 @@ class WorkloadService:
             if not start_date or not end_date:
                 return 0
 
-            start_date = getdate(start_date)
-            end_date = getdate(end_date)
+            return CalendarService.count_working_days_batch([(employee_id, start_date, end_date)])[0]
 
-            # Basic working days calculation (excluding weekends)
-            total_days = date_diff(end_date, start_date) + 1
-            working_days = 0
-            current_date = start_date
-            
-            while current_date <= end_date:
-                if current_date.weekday() < 5:  # Monday = 0, Sunday = 6
-                    working_days += 1
-                current_date = add_days(current_date, 1)
-            
-            # For assigned employees, subtract holidays if available
-            if employee_id != "unassigned":
-                try:
-                    # Try to get holidays if HRMS is available
-                    from hrms.hr.utils import get_holidays_for_employee
-                    holidays = get_holidays_for_employee(employee_id, start_date, end_date)
-                    holiday_count = len([h for h in holidays if getdate(h.holiday_date).weekday() < 5])
-                    working_days -= holiday_count
-                except (ImportError, Exception):
-                    # HRMS not available or error getting holidays
-                    pass
-            
-            return max(0, working_days)
-            
         except Exception as e:
             frappe.logger().error(f"Error calculating working days: {str(e)}")
             return 0
 
+    @staticmethod
+    def get_working_days_batch(queries):
+        """Calculate working days for many (employee_id, start_date, end_date) tuples"""
+        try:
+            return CalendarService.count_working_days_batch(queries)
+        except Exception as e:
+            frappe.logger().error(f"Error calculating working days: {str(e)}")
+            return [0] * len(queries)
+
     @staticmethod
     def calculate_employee_capacity(employee_id, start_date=None, end_date=None):
         """Calculate employee capacity and availability"""
         try:
-            if not start_date:
-                start_date = getdate()
-            if not end_date:
-                end_date = add_days(start_date, 30)
-            
-            start_date = getdate(start_date)
-            end_date = getdate(end_date)
-            
-            working_days = WorkloadService.get_working_days(employee_id, start_date, end_date)
-            daily_hours = 8  # Standard 8 hours per day
-            total_capacity = working_days * daily_hours
-            
-            # Get leave hours if employee is not unassigned
-            leave_hours = 0
-            if employee_id != "unassigned":
-                try:
-                    leaves = frappe.get_all(
-                        "Leave Application",
-                        filters={
-                            "employee": {"in": frappe.get_all("Employee", {"user_id": employee_id}, "name")},
-                            "status": "Approved",
-                            "from_date": ["<=", end_date],
-                            "to_date": [">=", start_date]
-                        },
-                        fields=["total_leave_days"]
-                    )
-                    leave_hours = sum(leave.total_leave_days * daily_hours for leave in leaves)
-                except Exception:
-                    pass
-            
-            available_capacity = max(0, total_capacity - leave_hours)
-            
-            return {
-                "total_capacity": total_capacity,
-                "available_capacity": available_capacity,
-                "working_days": working_days,
-                "leave_hours": leave_hours,
-                "availability": (available_capacity / total_capacity * 100) if total_capacity > 0 else 0
-            }
-            
+            return WorkloadService.calculate_bulk_capacity([employee_id], start_date, end_date)[employee_id]
         except Exception as e:
             frappe.logger().error(f"Error calculating capacity for {employee_id}: {str(e)}")
             return {
@@ -167,8 +140,67 @@ class WorkloadService:
             }
 
     @staticmethod
-    def get_workload_data(department=None, start_date=None, end_date=None):
-        """Get comprehensive workload data for planning"""
+    def calculate_bulk_capacity(employee_ids, start_date=None, end_date=None):
+        """Calculate capacity for many employees with a fixed number of queries
+
+        Holiday calendars and approved leaves are fetched once for the whole
+        set of employees and assembled in memory, so the query count does
+        not grow with the size of the department.
+        """
+        if not start_date:
+            start_date = getdate()
+        if not end_date:
+            end_date = add_days(start_date, 30)
+
+        start_date = getdate(start_date)
+        end_date = getdate(end_date)
+        daily_hours = 8  # Standard 8 hours per day
+
+        user_ids = list({e for e in employee_ids if e and e != "unassigned"})
+        calendars = CalendarService.get_employee_calendars(employee_ids)
+
+        leave_days = {}
+        if user_ids and is_hrms_installed():
+            try:
+                for leave in frappe.db.sql("""
+                    SELECT e.user_id, la.total_leave_days
+                    FROM `tabLeave Application` la
+                    INNER JOIN `tabEmployee` e ON e.name = la.employee
+                    WHERE e.user_id IN %(user_ids)s
+                    AND la.status = 'Approved'
+                    AND la.from_date <= %(end_date)s
+                    AND la.to_date >= %(start_date)s
+                """, {"user_ids": user_ids, "start_date": start_date, "end_date": end_date}, as_dict=True):
+                    leave_days[leave.user_id] = leave_days.get(leave.user_id, 0) + (leave.total_leave_days or 0)
+            except Exception as e:
+                frappe.logger().error(f"Error fetching leave applications: {str(e)}")
+
+        capacities = {}
+        for employee_id in employee_ids:
+            working_days = max(0, calendars[employee_id].count_working_days(start_date, end_date))
+            total_capacity = working_days * daily_hours
+            leave_hours = leave_days.get(employee_id, 0) * daily_hours
+            available_capacity = max(0, total_capacity - leave_hours)
+
+            capacities[employee_id] = {
+                "total_capacity": total_capacity,
+                "available_capacity": available_capacity,
+                "working_days": working_days,
+                "leave_hours": leave_hours,
+                "availability": (available_capacity / total_capacity * 100) if total_capacity > 0 else 0
+            }
+
+        return capacities
+
+    @staticmethod
+    def get_workload_data(department=None, start_date=None, end_date=None, fields=None):
+        """Get comprehensive workload data for planning
+
+        `fields` restricts the task columns selected and returned. Results
+        are served through the planner read-through cache.
+        """
+        fields = TaskService.parse_fields(fields, TASK_FIELD_COLUMNS)
+
         try:
             frappe.logger().info(f"Getting workload data for department: {department}")
 
@@ -177,66 +209,79 @@ class WorkloadService:
                 frappe.logger().warning(f"Department {department} not found")
                 return WorkloadService._get_empty_workload_data(department)
 
-            print("\n=== Getting Workload Data ===")
-            print(f"Department: {department}")
-            print(f"Start Date: {start_date}")
-            print(f"End Date: {end_date}")
-            
-            # Get employees and tasks
-            print("\nFetching employees...")
-            employees = WorkloadService.get_department_employees(department)
-            print(f"Found {len(employees)} employees")
-            
-            print("\nFetching tasks...")
-            tasks = TaskService.get_all_tasks(department, start_date, end_date)
-            print(f"Found {len(tasks)} tasks")
-            
-            if not employees:
-                print("\nChecking department and employee data...")
-                if department and not frappe.db.exists("Department", department):
-                    print(f"ERROR: Department '{department}' does not exist!")
-                else:
-                    active_employees = frappe.get_all(
-                        "Employee",
-                        filters={"status": "Active"},
-                        fields=["name", "department"]
-                    )
-                    print(f"Total active employees in system: {len(active_employees)}")
-                    if department:
-                        dept_employees = [e for e in active_employees if e.department == department]
-                        print(f"Active employees in department {department}: {len(dept_employees)}")
-            
-            # Process assignees with capacity information
-            assignees = []
-            for employee in employees:
-                capacity_info = WorkloadService.calculate_employee_capacity(
-                    employee["id"], start_date, end_date
-                )
-                
-                assignee_data = {
-                    **employee,
-                    "capacity": capacity_info["available_capacity"],
-                    "total_capacity": capacity_info["total_capacity"],
-                    "working_hours": {
-                        "hours_per_day": 8,
-                        "days_per_week": 5,
-                        "start_time": "09:00",
-                        "end_time": "17:00"
-                    },
-                    "availability": capacity_info["availability"]
-                }
-                assignees.append(assignee_data)
-            
-            return {
-                "assignees": assignees,
-                "tasks": tasks,
-                "capacity_settings": WorkloadService.get_capacity_settings()
-            }
+            return get_cached_workload(
+                department, start_date, end_date, fields,
+                lambda: WorkloadService._build_workload_data(department, start_date, end_date, fields)
+            )
             
         except Exception as e:
             frappe.logger().error(f"Error in get_workload_data: {str(e)}")
             return WorkloadService._get_empty_workload_data(department)
 
+    @staticmethod
+    def _build_workload_data(department, start_date, end_date, fields):
+        """Compute get_workload_data output; cached by the caller"""
+        print("\n=== Getting Workload Data ===")
+        print(f"Department: {department}")
+        print(f"Start Date: {start_date}")
+        print(f"End Date: {end_date}")
+        
+        # Get employees and tasks
+        print("\nFetching employees...")
+        employees = WorkloadService.get_department_employees(department)
+        print(f"Found {len(employees)} employees")
+        
+        print("\nFetching tasks...")
+        # Taken before the read so get_task_changes replays anything it misses
+        sync_cursor = SyncService.get_initial_cursor()
+        tasks = TaskService.fetch_all_tasks(department, start_date, end_date, overlap=True, fields=fields)
+        print(f"Found {len(tasks)} tasks")
+        
+        if not employees:
+            print("\nChecking department and employee data...")
+            if department and not frappe.db.exists("Department", department):
+                print(f"ERROR: Department '{department}' does not exist!")
+            else:
+                active_employees = frappe.get_all(
+                    "Employee",
+                    filters={"status": "Active"},
+                    fields=["name", "department"]
+                )
+                print(f"Total active employees in system: {len(active_employees)}")
+                if department:
+                    dept_employees = [e for e in active_employees if e.department == department]
+                    print(f"Active employees in department {department}: {len(dept_employees)}")
+        
+        # Process assignees with capacity information
+        capacities = WorkloadService.calculate_bulk_capacity(
+            [employee["id"] for employee in employees], start_date, end_date
+        )
+
+        assignees = []
+        for employee in employees:
+            capacity_info = capacities[employee["id"]]
+            
+            assignee_data = {
+                **employee,
+                "capacity": capacity_info["available_capacity"],
+                "total_capacity": capacity_info["total_capacity"],
+                "working_hours": {
+                    "hours_per_day": 8,
+                    "days_per_week": 5,
+                    "start_time": "09:00",
+                    "end_time": "17:00"
+                },
+                "availability": capacity_info["availability"]
+            }
+            assignees.append(assignee_data)
+        
+        return {
+            "assignees": assignees,
+            "tasks": tasks,
+            "capacity_settings": WorkloadService.get_capacity_settings(),
+            "sync_cursor": sync_cursor
+        }
+
     @staticmethod
     def _get_empty_workload_data(department=None):
         """Helper method to return empty workload data structure"""
@@ -257,6 +302,113 @@ class WorkloadService:
             "planning_horizon_days": 30
         }
 
+    @staticmethod
+    def get_workload_heatmap(department=None, start_date=None, end_date=None):
+        """Get hours allocated per assignee per day for a date window
+
+        Each task's expected_time is spread evenly over the working days of
+        its assignee between exp_start_date and exp_end_date. Spreads are
+        accumulated with a difference array per assignee so the cost is
+        O(tasks + assignees x days) instead of O(assignees x tasks x days).
+        """
+        if not start_date:
+            start_date = getdate()
+        if not end_date:
+            end_date = add_days(start_date, 30)
+
+        start_date = getdate(start_date)
+        end_date = getdate(end_date)
+        if start_date > end_date:
+            frappe.throw(_("Start date cannot be after end date"))
+
+        settings = WorkloadService.get_capacity_settings()
+        hours_per_day = settings["default_hours_per_day"]
+        days = date_diff(end_date, start_date) + 1
+        window_start = start_date.toordinal()
+
+        filters = TaskService.get_overlap_filters(department, start_date, end_date)
+        filters.append(["expected_time", ">", 0])
+        if department:
+            filters.append(["department", "=", department])
+
+        tasks = frappe.get_all(
+            "Atlas Task",
+            filters=filters,
+            fields=["name", "exp_start_date", "exp_end_date", "expected_time", "_assign"]
+        )
+
+        employees = WorkloadService.get_department_employees(department) if department else []
+        assignee_ids = [employee["id"] for employee in employees]
+
+        primary_assignees = TaskService.resolve_primary_assignees(tasks)
+        task_assignees = []
+        for task in tasks:
+            assignee = primary_assignees[task.name]
+            if assignee == "Unassigned":
+                assignee = "unassigned"
+            task_assignees.append(assignee)
+            if assignee not in assignee_ids:
+                assignee_ids.append(assignee)
+
+        calendars = CalendarService.get_employee_calendars(assignee_ids)
+
+        hours_diff = {assignee: [0.0] * (days + 1) for assignee in assignee_ids}
+        count_diff = {assignee: [0] * (days + 1) for assignee in assignee_ids}
+
+        for task, assignee in zip(tasks, task_assignees):
+            calendar = calendars[assignee]
+            working_days = calendar.count_working_days(task.exp_start_date, task.exp_end_date)
+            if working_days <= 0:
+                continue
+
+            rate = float(task.expected_time) / working_days
+            first = max(getdate(task.exp_start_date).toordinal(), window_start) - window_start
+            last = min(getdate(task.exp_end_date).toordinal() - window_start, days - 1)
+
+            hours_diff[assignee][first] += rate
+            hours_diff[assignee][last + 1] -= rate
+            count_diff[assignee][first] += 1
+            count_diff[assignee][last + 1] -= 1
+
+        # Working-day masks are computed once per distinct calendar
+        masks = {}
+        for calendar in set(calendars.values()):
+            masks[id(calendar)] = [
+                calendar.is_working_day(add_days(start_date, offset))
+                for offset in range(days)
+            ]
+
+        heatmap = {}
+        for assignee in assignee_ids:
+            mask = masks[id(calendars[assignee])]
+            load, task_counts, overloaded = [], [], []
+            hours, count = 0.0, 0
+
+            for offset in range(days):
+                hours += hours_diff[assignee][offset]
+                count += count_diff[assignee][offset]
+                day_hours = round(hours, 2) if mask[offset] else 0
+                load.append(day_hours)
+                task_counts.append(count if mask[offset] else 0)
+                if day_hours > hours_per_day:
+                    overloaded.append(offset)
+
+            heatmap[assignee] = {
+                "load": load,
+                "tasks": task_counts,
+                "capacity": [hours_per_day if working else 0 for working in mask],
+                "overloaded": overloaded,
+                "total_hours": round(sum(load), 2)
+            }
+
+        return {
+            "start_date": start_date,
+            "end_date": end_date,
+            "days": days,
+            "hours_per_day": hours_per_day,
+            "assignees": heatmap
+        }
+
     @staticmethod
     def get_capacity_analysis(department=None, start_date=None, end_date=None):
         """Get detailed capacity analysis for workload planning"""
@@ -280,13 +432,23 @@ class WorkloadService:
                 "recommendations": []
             }
             
+            # Scheduled hours come from the materialized load table, clipped to the window
+            if not start_date:
+                start_date = getdate()
+            if not end_date:
+                end_date = add_days(start_date, 30)
+            scheduled_hours_by_assignee = LoadService.get_scheduled_hours(
+                [a["id"] for a in workload_data["assignees"] if a["id"] != "unassigned"],
+                start_date, end_date
+            )
+
             # Analyze each assignee
             for assignee in workload_data["assignees"]:
                 if assignee["id"] == "unassigned":
                     continue
                     
                 assignee_tasks = [t for t in scheduled_tasks if t.get("assignee") == assignee["id"]]
-                scheduled_hours = sum(float(t.get("duration", 0)) for t in assignee_tasks)
+                scheduled_hours = scheduled_hours_by_assignee.get(assignee["id"], 0)
                 
                 capacity = assignee.get("capacity", 0)
                 utilization = (scheduled_hours / capacity * 100) if capacity > 0 else 0
@@ -19,9 +19,17 @@ class TestPlannerBase(FrappeTestCase):
         """Clear any existing test data"""
         try:
             frappe.db.sql("""DELETE FROM `tabTask` WHERE name = 'TEST-TASK-001'""")
+            if frappe.db.table_exists("Leave Application"):
+                frappe.db.sql("""
+                    DELETE FROM `tabLeave Application` WHERE employee IN (
+                        SELECT name FROM `tabEmployee` WHERE employee_number = 'TEST-EMP-001'
+                    )
+                """)
             frappe.db.sql("""DELETE FROM `tabEmployee` WHERE employee_number = 'TEST-EMP-001'""")
             frappe.db.sql("""DELETE FROM `tabDepartment` WHERE name LIKE 'Test Department%'""")
             frappe.db.sql("""DELETE FROM `tabUser` WHERE name = 'test.employee@example.com'""")
+            frappe.db.sql("""DELETE FROM `tabHoliday List` WHERE name = '_Test Planner Holidays'""")
+            frappe.db.sql("""DELETE FROM `tabHoliday` WHERE parent = '_Test Planner Holidays'""")
             frappe.db.commit()
         except Exception:
             frappe.db.rollback()
@@ -137,6 +145,26 @@ class TestPlannerAPICritical(TestPlannerBase):
             frappe.log_error(f"Error in test_task_crud_operations: {str(e)}")
             raise
 
+    def test_move_conflict(self):
+        """A move made against a stale `modified` reports a conflict and writes nothing"""
+        tasks = TaskService.get_all_tasks(department="Test Department")
+        self.assertTrue(len(tasks) > 0, "No tasks found")
+        task_id = tasks[0]["id"]
+        columns = ["_assign", "exp_start_date", "exp_end_date", "modified"]
+        before = frappe.db.get_value("Atlas Task", task_id, columns, as_dict=True)
+
+        result = TaskService.move_task(
+            task_id,
+            "unassigned",
+            "2024-02-01",
+            "2024-02-02",
+            modified="2000-01-01 00:00:00"
+        )
+        self.assertFalse(result["success"])
+        self.assertTrue(result["conflict"])
+        self.assertEqual(result["task"]["id"], task_id)
+        self.assertEqual(frappe.db.get_value("Atlas Task", task_id, columns, as_dict=True), before)
+
     def test_workload_operations(self):
         """Test critical workload operations"""
         try:
@@ -178,6 +206,246 @@ class TestPlannerAPICritical(TestPlannerBase):
             frappe.log_error(f"Error in test_workload_operations: {str(e)}")
             raise
 
+    def test_bulk_capacity(self):
+        """Capacity subtracts weekday holidays and approved leave"""
+        from planner.services.calendar_service import is_hrms_installed
+
+        employee = frappe.db.get_value("Employee", {"employee_number": "TEST-EMP-001"})
+        holiday_list = frappe.get_doc({
+            "doctype": "Holiday List",
+            "holiday_list_name": "_Test Planner Holidays",
+            "from_date": "2023-01-01",
+            "to_date": "2023-12-31",
+            "holidays": [
+                {"holiday_date": "2023-12-25", "description": "Christmas"},
+                {"holiday_date": "2023-12-26", "description": "Boxing Day"},
+                # Saturday: not a working day anyway
+                {"holiday_date": "2023-12-30", "description": "Weekend"}
+            ]
+        }).insert(ignore_permissions=True)
+        frappe.db.set_value("Employee", employee, "holiday_list", holiday_list.name)
+
+        leave_days = 0
+        if is_hrms_installed():
+            leave_days = 2
+            frappe.get_doc({
+                "doctype": "Leave Application",
+                "employee": employee,
+                "from_date": "2023-12-11",
+                "to_date": "2023-12-12",
+                "total_leave_days": leave_days,
+                "status": "Approved",
+                "docstatus": 1
+            }).db_insert()
+
+        capacities = WorkloadService.calculate_bulk_capacity(
+            ["test.employee@example.com", "unassigned"], "2023-12-01", "2023-12-31"
+        )
+
+        # December 2023 has 21 weekdays, two of them holidays
+        employee_capacity = capacities["test.employee@example.com"]
+        self.assertEqual(employee_capacity["working_days"], 19)
+        self.assertEqual(employee_capacity["total_capacity"], 19 * 8)
+        self.assertEqual(employee_capacity["leave_hours"], leave_days * 8)
+        self.assertEqual(employee_capacity["available_capacity"], (19 - leave_days) * 8)
+
+        self.assertEqual(capacities["unassigned"]["working_days"], 21)
+        self.assertEqual(capacities["unassigned"]["total_capacity"], 21 * 8)
+        self.assertEqual(
+            WorkloadService.calculate_employee_capacity("unassigned", "2023-12-01", "2023-12-31"),
+            capacities["unassigned"]
+        )
+
+    def test_keyset_cursor(self):
+        """Keyset cursors round-trip and invalid cursors are rejected"""
+        from frappe.utils import get_datetime
+
+        task = frappe._dict(creation=get_datetime("2023-12-01 10:00:00.123456"), name="TASK-2023-00001")
+        cursor = TaskService.encode_cursor(task)
+        self.assertEqual(TaskService.decode_cursor(cursor), (task.creation, task.name))
+
+        with self.assertRaises(frappe.ValidationError):
+            TaskService.decode_cursor("not-a-cursor")
+
+        rows, next_cursor = TaskService.split_page([task, task], 1)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(next_cursor, cursor)
+        self.assertEqual(TaskService.split_page([task], 1), ([task], None))
+        self.assertEqual(TaskService.get_page_length(10 ** 9), 5000)
+
+    def test_read_through_cache(self):
+        """Cached task sets are reused until a change touching them is invalidated"""
+        from planner.cache import get_cached_tasks, invalidate_task_changes, clear_task_cache
+
+        calls = []
+        def loader():
+            calls.append(1)
+            return [{"id": "TASK-CACHE-1"}]
+
+        args = ("Test Department", "2023-12-01", "2023-12-31", ["id"])
+        clear_task_cache("Test Department")
+        clear_task_cache()
+        self.assertEqual(get_cached_tasks(*args, loader=loader), [{"id": "TASK-CACHE-1"}])
+        get_cached_tasks(*args, loader=loader)
+        self.assertEqual(len(calls), 1)
+
+        # A different window is a different entry
+        get_cached_tasks("Test Department", "2024-01-01", "2024-01-31", ["id"], loader=loader)
+        self.assertEqual(len(calls), 2)
+
+        # A change in another department or outside the window keeps the entry
+        outside = frappe._dict(department="Other", exp_start_date="2023-12-05", exp_end_date="2023-12-06")
+        invalidate_task_changes([(None, outside)])
+        later = frappe._dict(department="Test Department", exp_start_date="2024-03-01", exp_end_date="2024-03-02")
+        invalidate_task_changes([(None, later)])
+        frappe.db.commit()
+        get_cached_tasks(*args, loader=loader)
+        self.assertEqual(len(calls), 2)
+
+        # Invalidation waits for the commit
+        inside = frappe._dict(department="Test Department", exp_start_date="2023-12-30", exp_end_date="2024-01-02")
+        invalidate_task_changes([(None, inside)])
+        get_cached_tasks(*args, loader=loader)
+        self.assertEqual(len(calls), 2)
+        frappe.db.commit()
+        get_cached_tasks(*args, loader=loader)
+        get_cached_tasks("Test Department", "2024-01-01", "2024-01-31", ["id"], loader=loader)
+        self.assertEqual(len(calls), 4)
+
+        # An undated task only reaches open windows and its dated side's span
+        open_args = ("Test Department", None, None, ["id"])
+        get_cached_tasks(*open_args, loader=loader)
+        self.assertEqual(len(calls), 5)
+        undated = frappe._dict(department="Test Department", exp_start_date=None, exp_end_date="2024-03-01")
+        invalidate_task_changes([(None, undated)])
+        frappe.db.commit()
+        get_cached_tasks(*args, loader=loader)
+        self.assertEqual(len(calls), 5)
+        get_cached_tasks(*open_args, loader=loader)
+        self.assertEqual(len(calls), 6)
+
+    def test_invalidation_during_load(self):
+        """Rows loaded before a change committed are returned but never cached"""
+        from planner.cache import get_cached_tasks, invalidate_task_changes, clear_task_cache
+
+        args = ("Test Department", "2023-12-01", "2023-12-31", ["id"])
+        change = frappe._dict(department="Test Department", exp_start_date="2023-12-05", exp_end_date="2023-12-06")
+        clear_task_cache("Test Department")
+
+        def racing_loader():
+            # A writer commits while this reader is still loading
+            invalidate_task_changes([(None, change)])
+            frappe.db.commit()
+            return [{"id": "BEFORE"}]
+
+        self.assertEqual(get_cached_tasks(*args, loader=racing_loader), [{"id": "BEFORE"}])
+        self.assertEqual(get_cached_tasks(*args, loader=lambda: [{"id": "AFTER"}]), [{"id": "AFTER"}])
+        self.assertEqual(get_cached_tasks(*args, loader=lambda: [{"id": "UNUSED"}]), [{"id": "AFTER"}])
+
+        # Same for a generation bump (clear_task_cache) while loading
+        def clearing_loader():
+            clear_task_cache("Test Department")
+            return [{"id": "BEFORE"}]
+
+        clear_task_cache("Test Department")
+        get_cached_tasks(*args, loader=clearing_loader)
+        self.assertEqual(get_cached_tasks(*args, loader=lambda: [{"id": "AFTER"}]), [{"id": "AFTER"}])
+
+    def test_local_cache_revision(self):
+        """Invalidating one department drops only that department's process-local copies"""
+        from planner.cache import get_cached_tasks, get_namespace_key, invalidate_task_changes, clear_task_cache
+
+        window = ("2023-12-01", "2023-12-31", ["id"])
+        for department in ("Test Department", "Test Department 2"):
+            clear_task_cache(department)
+            get_cached_tasks(department, *window, loader=lambda: [{"id": "CACHED"}])
+            # Leave only the process-local copy
+            frappe.cache().delete_value(get_namespace_key("PLANNER_TASKS", department))
+
+        # Outside the window: Redis would keep the entry, the local tier still drops it
+        change = frappe._dict(department="Test Department", exp_start_date="2024-03-01", exp_end_date="2024-03-02")
+        invalidate_task_changes([(None, change)])
+        frappe.db.commit()
+
+        reload = lambda: [{"id": "RELOADED"}]
+        self.assertEqual(get_cached_tasks("Test Department", *window, loader=reload), [{"id": "RELOADED"}])
+        self.assertEqual(get_cached_tasks("Test Department 2", *window, loader=reload), [{"id": "CACHED"}])
+
+    def test_local_cache_expiry(self):
+        """Local entries last LOCAL_CACHE_TTL or until their Redis expiry, whichever is first"""
+        from unittest.mock import patch
+        from planner import cache
+
+        now = 1000000.0
+        with patch("planner.cache.time") as clock:
+            clock.time.return_value = now
+            cache.set_local(("test-expiry", "long"), 0, {"expires": now + cache.LOCAL_CACHE_TTL * 2, "data": 1}, 10)
+            cache.set_local(("test-expiry", "short"), 0, {"expires": now + 5, "data": 2}, 10)
+
+            clock.time.return_value = now + 6
+            self.assertIsNone(cache.get_local(("test-expiry", "short"), 0))
+            self.assertEqual(cache.get_local(("test-expiry", "long"), 0)["data"], 1)
+
+            clock.time.return_value = now + cache.LOCAL_CACHE_TTL + 1
+            self.assertIsNone(cache.get_local(("test-expiry", "long"), 0))
+
+    def test_dead_entries_pruned(self):
+        """Variants past their stale window are deleted on read and by the hourly prune"""
+        import redis
+        from unittest.mock import patch
+        from planner import cache
+
+        key = cache.get_namespace_key('PLANNER_TASKS', "Test Department")
+        redis_key = frappe.cache().make_key(key)
+        now = 1000000.0
+        with patch("planner.cache.time") as clock:
+            clock.time.return_value = now
+            cache.set_entry('PLANNER_TASKS', key, "read", [1])
+            cache.set_entry('PLANNER_TASKS', key, "unread", [2])
+
+            clock.time.return_value = now + cache.CACHE_EXPIRY['PLANNER_TASKS'] + cache.get_stale_seconds() + 1
+            cache.set_entry('PLANNER_TASKS', key, "fresh", [3])
+            self.assertEqual(cache.get_entry('PLANNER_TASKS', key, "read"), (None, 0))
+            self.assertFalse(redis.Redis.hexists(frappe.cache(), redis_key, "read"))
+
+            cache.prune_dead_entries()
+            self.assertFalse(redis.Redis.hexists(frappe.cache(), redis_key, "unread"))
+            self.assertTrue(redis.Redis.hexists(frappe.cache(), redis_key, "fresh"))
+
+    def test_local_cache_budget(self):
+        """LRU eviction keeps the tier within planner_local_cache_bytes; 0 disables it"""
+        import time
+        from planner import cache
+
+        entry = {"expires": time.time() + 60, "data": "x"}
+        frappe.conf.planner_local_cache_bytes = 25
+        try:
+            cache.set_local(("test-budget", "a"), 0, entry, 10)
+            cache.set_local(("test-budget", "b"), 0, entry, 10)
+            cache.get_local(("test-budget", "a"), 0)
+            cache.set_local(("test-budget", "c"), 0, entry, 10)
+
+            self.assertIsNotNone(cache.get_local(("test-budget", "a"), 0))
+            self.assertIsNone(cache.get_local(("test-budget", "b"), 0))
+            self.assertIsNotNone(cache.get_local(("test-budget", "c"), 0))
+            self.assertLessEqual(cache._local_cache_bytes, 25)
+
+            frappe.conf.planner_local_cache_bytes = 0
+            cache.set_local(("test-budget", "d"), 0, entry, 10)
+            self.assertIsNone(cache.get_local(("test-budget", "d"), 0))
+        finally:
+            frappe.conf.pop("planner_local_cache_bytes", None)
+
+    def test_data_version_bumps_after_commit(self):
+        """The ETag data version only moves once the writing transaction commits"""
+        from planner.services.version_service import VersionService, bump_data_version
+
+        version = VersionService.get_data_version()
+        bump_data_version()
+        self.assertEqual(VersionService.get_data_version(), version)
+        frappe.db.commit()
+        self.assertNotEqual(VersionService.get_data_version(), version)
+
     def test_error_handling(self):
         """Test critical error scenarios"""
         from planner.api import handle_api_error
@@ -198,6 +466,11 @@ class TestPlannerAPICritical(TestPlannerBase):
                 "2023-12-02"
             )
 
+        # Unknown backlog fields are rejected, not answered with an empty backlog
+        from planner.api import planner_get_backlog
+        with self.assertRaises(frappe.ValidationError):
+            planner_get_backlog(fields="no_such_field")
+
         # Test invalid department
         workload_data = WorkloadService.get_workload_data(
             department="Invalid Department"
@@ -247,14 +520,70 @@ class TestPlannerAPICritical(TestPlannerBase):
             }]
             
             result = TaskService.batch_update_tasks(updates)
-            self.assertTrue(len(result) > 0)
-            self.assertEqual(result[0]["status"], "Working")
-            self.assertEqual(result[0]["priority"], "High")
+            self.assertEqual(len(result), 1)
+            self.assertTrue(result[0]["success"])
+            self.assertEqual(result[0]["task"]["status"], "Working")
+            self.assertEqual(result[0]["task"]["priority"], "High")
+
+            # Invalid items fail on their own without blocking valid ones
+            result = TaskService.batch_update_tasks([
+                {"task_id": task["id"], "changes": {"progress": 150}},
+                {"task_id": "INVALID-TASK", "changes": {"status": "Open"}},
+                {"task_id": task["id"], "changes": {"status": "Open"}}
+            ])
+            self.assertEqual([r["success"] for r in result], [False, False, True])
 
         except Exception as e:
             frappe.log_error(f"Error in test_batch_operations: {str(e)}")
             raise
 
+    def test_create_tasks(self):
+        """Bulk creation reserves consecutive series names and fails bad rows on their own"""
+        from frappe.model.naming import parse_naming_series
+        from planner.services.task_service import CREATE_TASK_SERIES
+
+        dept_name = frappe.db.get_value("Department", {"department_name": "Test Department"})
+        prefix = parse_naming_series(CREATE_TASK_SERIES)
+        created = []
+        try:
+            result = TaskService.create_tasks([
+                {"subject": "Bulk Task 1", "department": dept_name},
+                {"subject": ""},
+                {"subject": "Bulk Task 2", "progress": 150},
+                {"subject": "Bulk Task 3", "department": "No Such Department"},
+                {"subject": "Bulk Task 4", "parent_task": "NO-SUCH-TASK"},
+                {"subject": "Bulk Task 5", "department": dept_name}
+            ])
+            self.assertEqual([r["success"] for r in result], [True, False, False, False, False, True])
+            self.assertIn("No Such Department", result[3]["error"])
+            self.assertIn("NO-SUCH-TASK", result[4]["error"])
+
+            names = [r["name"] for r in result if r["success"]]
+            created.extend(names)
+            self.assertTrue(all(name.startswith(prefix) for name in names))
+            numbers = [int(name[len(prefix):]) for name in names]
+            self.assertEqual(numbers[1], numbers[0] + 1)
+            self.assertEqual(frappe.db.count("Atlas Task", {"name": ["in", names]}), 2)
+
+            # insert() continues after the reserved block instead of colliding with it
+            doc = frappe.get_doc({
+                "doctype": "Atlas Task",
+                "subject": "Bulk Task 6",
+                "naming_series": CREATE_TASK_SERIES
+            }).insert()
+            created.append(doc.name)
+            self.assertEqual(doc.name, f"{prefix}{numbers[1] + 1:05d}")
+
+            # Reservations are consecutive blocks that do not overlap
+            block = TaskService.reserve_series(CREATE_TASK_SERIES, 3)
+            self.assertEqual(block, [f"{prefix}{n:05d}" for n in range(numbers[1] + 2, numbers[1] + 5)])
+            self.assertEqual(TaskService.reserve_series(CREATE_TASK_SERIES, 1), [f"{prefix}{numbers[1] + 5:05d}"])
+
+        finally:
+            for name in created:
+                frappe.delete_doc("Atlas Task", name, force=True)
+            frappe.db.commit()
+
     def tearDown(self):
         """Clean up test data after each test"""
         try:
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+from frappe.tests.utils import FrappeTestCase
+from planner.services.calendar_service import CalendarService, HolidayCalendar
+
+
+class TestCalendarService(FrappeTestCase):
+    def test_count_weekdays_matches_daily_walk(self):
+        """Closed-form weekday count agrees with walking the range"""
+        start = date(2023, 1, 1)
+        for offset in range(0, 30):
+            for length in range(-2, 40):
+                range_start = start + timedelta(days=offset)
+                range_end = range_start + timedelta(days=length)
+                expected = sum(
+                    1 for i in range(length + 1)
+                    if (range_start + timedelta(days=i)).weekday() < 5
+                )
+                self.assertEqual(
+                    CalendarService.count_weekdays(range_start, range_end),
+                    expected,
+                    f"{range_start} - {range_end}"
+                )
+
+    def test_holiday_calendar(self):
+        """Weekday holidays are subtracted, weekend holidays are ignored"""
+        calendar = HolidayCalendar("Test", ["2023-12-25", "2023-12-26", "2023-12-30"])
+
+        self.assertEqual(calendar.count_working_days("2023-12-01", "2023-12-31"), 19)
+        self.assertEqual(calendar.count_working_days("2023-12-31", "2023-12-01"), 0)
+        self.assertFalse(calendar.is_working_day("2023-12-25"))
+        self.assertFalse(calendar.is_working_day("2023-12-30"))
+        self.assertTrue(calendar.is_working_day("2023-12-27"))
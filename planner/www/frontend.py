@@ -10,4 +10,8 @@ def get_context(context):
 	frappe.db.commit()
 	if frappe.session.user != "Guest":
 		capture("active_site", "planner")
-	context.csrf_token = csrf_token
\ No newline at end of file
+	context.csrf_token = csrf_token
+	# socket.io runs on its own port only under `bench start`
+	context.dev_server = 1 if frappe._dev_server else 0
+	context.socketio_port = frappe.conf.socketio_port or 9000
+	context.site_name = frappe.local.site
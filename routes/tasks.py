@@ -241,10 +241,11 @@ def get_backlog():
             order_by="creation desc"
         )
         
+        assignees = TaskService.resolve_primary_assignees(tasks)
         formatted_tasks = []
         for task in tasks:
             try:
-                formatted_task = TaskService.format_task(task)
+                formatted_task = TaskService.format_task(task, assignees[task.name])
                 formatted_tasks.append(formatted_task)
             except Exception as e:
                 frappe.logger().error(f"Error formatting task {task.name}: {str(e)}")
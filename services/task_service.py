@@ -43,26 +43,49 @@ class TaskService:
                     })
         return assignees
 
+    @staticmethod
+    def resolve_primary_assignees(tasks):
+        """Map task name to its primary assignee for a whole result set
+
+        Parses `_assign` of every task and validates all distinct users with
+        a single query. Tasks without a valid assignee map to "Unassigned".
+        """
+        first_assignees = {}
+        for task in tasks:
+            assignee = None
+            if task._assign:
+                try:
+                    assigned_users = frappe.parse_json(task._assign)
+                    if assigned_users:
+                        assignee = assigned_users[0]
+                except Exception:
+                    frappe.logger().error(f"Invalid _assign value on task {task.name}")
+            first_assignees[task.name] = assignee
+
+        users = list({assignee for assignee in first_assignees.values() if assignee})
+        valid_users = set()
+        if users:
+            valid_users = set(frappe.get_all("User", filters={"name": ["in", users]}, pluck="name"))
+            invalid_users = set(users) - valid_users
+            if invalid_users:
+                frappe.logger().warning(f"Ignoring invalid assignees: {', '.join(sorted(invalid_users))}")
+
+        return {
+            name: assignee if assignee in valid_users else "Unassigned"
+            for name, assignee in first_assignees.items()
+        }
+
     @staticmethod
     def get_primary_assignee(task):
         """Get the primary assignee from _assign field"""
-        try:
-            if task._assign:
-                assigned_users = frappe.parse_json(task._assign)
-                if assigned_users and len(assigned_users) > 0:
-                    assignee = assigned_users[0]
-                    if frappe.db.exists("User", assignee):
-                        return assignee
-                    frappe.logger().warning(f"Invalid user {assignee} assigned to task {task.name}")
-        except Exception as e:
-            frappe.logger().error(f"Error getting primary assignee for task {task.name}: {str(e)}")
-        return "Unassigned"
+        return TaskService.resolve_primary_assignees([task])[task.name]
 
     @staticmethod
-    def format_task(task):
+    def format_task(task, assignee=None):
         """Format task for API response"""
         try:
-            assignee = TaskService.get_primary_assignee(task)
+            if assignee is None:
+                assignee = TaskService.get_primary_assignee(task)
             
             return {
                 "id": task.name,
@@ -240,7 +263,8 @@ class TaskService:
                 order_by="creation desc"
             )
             
-            return [TaskService.format_task(task) for task in tasks]
+            assignees = TaskService.resolve_primary_assignees(tasks)
+            return [TaskService.format_task(task, assignees[task.name]) for task in tasks]
             
         except Exception as e:
             frappe.logger().error(f"Error in get_all_tasks: {str(e)}")
@@ -7,44 +7,30 @@ class WorkloadService:
     @staticmethod
     def get_department_employees(department=None):
         """Get all employees in a department with their details"""
-        filters = {"status": "Active"}
+        query = """
+            SELECT
+                e.name, e.employee_name, e.user_id, e.image,
+                e.department, e.designation, e.company,
+                u.full_name, u.user_image, u.email
+            FROM `tabEmployee` e
+            LEFT JOIN `tabUser` u ON u.name = e.user_id
+            WHERE e.status = 'Active'
+        """
         if department:
-            filters["department"] = department
+            query += " AND e.department = %(department)s"
         
-        employees = frappe.get_all(
-            "Employee",
-            filters=filters,
-            fields=[
-                "name", "employee_name", "user_id", "image", 
-                "department", "designation", "company"
-            ]
-        )
+        employees = frappe.db.sql(query, {"department": department}, as_dict=True)
         
-        employee_list = []
-        for emp in employees:
-            # Get user details if user_id exists
-            user_info = {}
-            if emp.user_id:
-                user_info = frappe.get_cached_value(
-                    "User", 
-                    emp.user_id, 
-                    ["full_name", "user_image", "email"], 
-                    as_dict=True
-                ) or {}
-            
-            employee_data = {
-                "id": emp.user_id or emp.name,
-                "employee_id": emp.name,
-                "name": user_info.get("full_name") or emp.employee_name,
-                "email": user_info.get("email") or emp.user_id,
-                "image": user_info.get("user_image") or emp.image,
-                "role": emp.designation,
-                "department": emp.department,
-                "company": emp.company
-            }
-            employee_list.append(employee_data)
-        
-        return employee_list
+        return [{
+            "id": emp.user_id or emp.name,
+            "employee_id": emp.name,
+            "name": emp.full_name or emp.employee_name,
+            "email": emp.email or emp.user_id,
+            "image": emp.user_image or emp.image,
+            "role": emp.designation,
+            "department": emp.department,
+            "company": emp.company
+        } for emp in employees]
 
     @staticmethod
     def get_employee_working_hours(employee_id):